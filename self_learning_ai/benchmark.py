@@ -0,0 +1,294 @@
+import argparse
+import contextlib
+import io
+import json
+import math
+import os
+import random
+import resource
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import metrics
+from cleaner import clean_text
+from dataset import DatasetWriter
+from evaluator import evaluate_summary
+from frontier import Frontier
+from pdf_extractor import PdfExtractor
+from scraper import fetch_open_edu_articles
+from summarizer import summarize_text
+from trainer import save_training_pair
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "benchmark_baseline.json")
+STAGES = ["fetch", "extract_pdf", "clean", "summarize", "evaluate", "save"]
+# Allowed relative change before a run counts as a regression; millisecond stage latencies
+# swing by half on a busy machine, so they get the widest margin
+THRESHOLDS = {"docs_per_second": 0.25, "latency": 1.0, "peak_rss_mb": 0.25}
+# p95 latencies below this many seconds are timer noise and never compared
+MIN_LATENCY = 0.002
+
+TOPICS = ["recursion", "sorting", "graphs", "hashing", "databases", "networks", "compilers", "security",
+          "algebra", "statistics", "writing", "literacy"]
+VERBS = ["introduces", "revisits", "compares", "applies", "summarizes", "questions", "extends", "illustrates"]
+NOUNS = ["students", "exercises", "lectures", "examples", "proofs", "projects", "readings", "problem sets",
+         "case studies", "diagrams", "experiments", "notes"]
+# Sentences per HTML page; most pages are short, a few are long chapters
+PAGE_SIZES = [12, 12, 30, 30, 60, 120, 400]
+
+
+def make_pdf(pages, lines_per_page=30, line="Page {page} line {line} covers open course material."):
+    # Builds a plain multi-page PDF with one Helvetica text block per page
+    objects = [b"<< /Type /Catalog /Pages 2 0 R >>", None,
+               b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"]
+    kids = []
+    for n in range(pages):
+        lines = " ".join(f"({line.format(page=n, line=i)}) Tj T*" for i in range(lines_per_page))
+        stream = f"BT /F1 10 Tf 12 TL 50 780 Td {lines} ET".encode("ascii")
+        objects.append(b"<< /Length %d >>\nstream\n%s\nendstream" % (len(stream), stream))
+        content_id = len(objects)
+        objects.append(b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+                       b"/Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>" % content_id)
+        kids.append(b"%d 0 R" % len(objects))
+    objects[1] = b"<< /Type /Pages /Kids [%s] /Count %d >>" % (b" ".join(kids), pages)
+
+    out = io.BytesIO()
+    out.write(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(out.tell())
+        out.write(b"%d 0 obj\n%s\nendobj\n" % (number, body))
+    xref = out.tell()
+    out.write(b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1))
+    for offset in offsets:
+        out.write(b"%010d 00000 n \n" % offset)
+    out.write(b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref))
+    return out.getvalue()
+
+
+def _article(rng, topic, doc_id, sentences):
+    lines = [f"Unit {doc_id} introduces {topic} and explains why {topic} matters for students."]
+    for i in range(sentences - 2):
+        first, second = rng.sample(NOUNS, 2)
+        lines.append(f"Part {i} {rng.choice(VERBS)} {topic} through {first} and {second} in unit {doc_id}.")
+    lines.append(f"In conclusion, {topic} gives students a foundation for later courses.")
+    # Paragraphs of eight sentences, separated the way the cleaner expects
+    return "</p><p>".join(" ".join(lines[i:i + 8]) for i in range(0, len(lines), 8))
+
+
+def build_corpus(pages=40, pdfs=4, sections=4, seed=0):
+    # Routes for a site of section hubs linking to HTML pages of varying size and link fan-out, plus PDFs
+    rng = random.Random(seed)
+    section_links = {s: [] for s in range(sections)}
+    routes = {}
+    docs = [f"/s{i % sections}/unit_{i}.html" for i in range(pages)]
+    for i, path in enumerate(docs):
+        topic = TOPICS[i % len(TOPICS)]
+        fanout = rng.randint(0, 8)
+        related = "".join(f"<a href='{link}'>related</a>" for link in rng.sample(docs, min(fanout, len(docs))))
+        body = _article(rng, topic, i, rng.choice(PAGE_SIZES))
+        routes[path] = (f"<html><head><title>{topic}</title><script>var unit = {i};</script></head>"
+                        f"<body><nav><a href='/'>home</a></nav><h1>{topic}</h1><p>{body}</p>{related}"
+                        f"<footer>Open course material</footer></body></html>")
+        section_links[i % sections].append(path)
+    for i in range(pdfs):
+        path = f"/s{i % sections}/notes_{i}.pdf"
+        routes[path] = make_pdf(rng.choice([2, 5, 20]), line=f"Notes {i} page {{page}} line {{line}} "
+                                                              f"review {TOPICS[i % len(TOPICS)]} for the course.")
+        section_links[i % sections].append(path)
+    for s, links in section_links.items():
+        routes[f"/s{s}/"] = "<html><body>" + "".join(f"<a href='{link}'>unit</a>" for link in links) + "</body></html>"
+    routes["/"] = "<html><body>" + "".join(f"<a href='/s{s}/'>section</a>" for s in range(sections)) + "</body></html>"
+    return routes
+
+
+class CorpusHandler(BaseHTTPRequestHandler):
+    # Serves the server's routes over keep-alive connections
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        body = self.server.routes.get(self.path)
+        if body is None:
+            self.send_response(404)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        data = body if isinstance(body, bytes) else body.encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/pdf" if self.path.endswith(".pdf") else "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, *args):
+        pass
+
+
+@contextlib.contextmanager
+def serve_corpus(routes):
+    server = ThreadingHTTPServer(("127.0.0.1", 0), CorpusHandler)
+    server.daemon_threads = True
+    server.routes = routes
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        yield f"http://127.0.0.1:{server.server_address[1]}/"
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def percentile(values, q):
+    # Nearest-rank percentile
+    ordered = sorted(values)
+    return ordered[max(0, min(len(ordered), math.ceil(q * len(ordered))) - 1)]
+
+
+def _peak_rss_mb(who):
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS
+    peak = resource.getrusage(who).ru_maxrss
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def _process(articles, writer):
+    saved = 0
+    for path, text in articles:
+        cleaned = clean_text(text)
+        if not cleaned:
+            continue
+        summary = summarize_text(cleaned)
+        evaluate_summary(summary, cleaned)
+        name = os.path.splitext(os.path.basename(path))[0]
+        saved += save_training_pair(cleaned, summary, f"pair_{name}.json", writer=writer)
+    return saved
+
+
+def _run_once(routes, workers, per_host):
+    # One crawl of the stand-in corpus, every article then going through clean -> summarize ->
+    # evaluate -> save, all under a temporary directory. Returns the registry snapshot with raw samples.
+    articles = []
+    metrics.REGISTRY.reset()
+    with tempfile.TemporaryDirectory() as tmp, serve_corpus(routes) as seed_url:
+        frontier = Frontier(":memory:", max_depth=2)
+        extractor = PdfExtractor()
+        writer = DatasetWriter(os.path.join(tmp, "fine_tune"))
+        try:
+            started = time.perf_counter()
+            fetch_open_edu_articles([seed_url], limit=len(routes), workers=workers, per_host=per_host,
+                                    delay=0, out_dir=os.path.join(tmp, "raw"), frontier=frontier,
+                                    extractor=extractor, on_article=lambda path, text, record: articles.append((path, text)))
+            saved = _process(articles, writer)
+            elapsed = time.perf_counter() - started
+        finally:
+            writer.close()
+            extractor.close()
+            frontier.close()
+    return len(articles), saved, elapsed, metrics.REGISTRY.snapshot()
+
+
+def run_benchmark(pages=40, pdfs=4, sections=4, seed=0, repeat=3, workers=8, per_host=4, quiet=True):
+    # Best of `repeat` runs: the fastest throughput and each stage's lowest p50/p95, so one noisy
+    # run does not fail the comparison. Stage latencies are the metrics registry's raw samples.
+    routes = build_corpus(pages, pdfs, sections, seed)
+    was_enabled, registry = metrics.enabled(), metrics.REGISTRY
+    registry.keep_samples = True
+    metrics.enable()
+    runs = []
+    try:
+        with contextlib.redirect_stdout(io.StringIO()) if quiet else contextlib.nullcontext():
+            for _ in range(repeat):
+                runs.append(_run_once(routes, workers, per_host))
+    finally:
+        metrics.enable(was_enabled)
+        registry.keep_samples = False
+        registry.reset()
+
+    documents, saved, elapsed, snapshot = min(runs, key=lambda run: run[2])
+    stages = {}
+    for *_, run_snapshot in runs:
+        for (name, labels), values in run_snapshot["samples"]:
+            stage = dict(labels).get("stage")
+            if name != "stage_seconds" or stage not in STAGES:
+                continue
+            best = stages.setdefault(stage, {"count": len(values), "p50": float("inf"), "p95": float("inf")})
+            best["p50"] = min(best["p50"], round(percentile(values, 0.5), 6))
+            best["p95"] = min(best["p95"], round(percentile(values, 0.95), 6))
+    return {
+        "corpus": {"pages": pages, "pdfs": pdfs, "sections": sections, "seed": seed},
+        "repeat": repeat,
+        "documents": documents,
+        "saved": saved,
+        "seconds": round(elapsed, 3),
+        "docs_per_second": round(documents / elapsed, 2),
+        "bytes_downloaded": sum(v for (name, _), v in snapshot["counters"] if name == "http_bytes_total"),
+        "peak_rss_mb": _peak_rss_mb(resource.RUSAGE_SELF),
+        "peak_child_rss_mb": _peak_rss_mb(resource.RUSAGE_CHILDREN),
+        "stages": {stage: stages[stage] for stage in STAGES if stage in stages},
+    }
+
+
+def compare(result, baseline, thresholds=THRESHOLDS):
+    # Returns a message per metric that got worse than the baseline by more than its threshold
+    regressions = []
+    floor = baseline["docs_per_second"] * (1 - thresholds["docs_per_second"])
+    if result["docs_per_second"] < floor:
+        regressions.append(f"throughput {result['docs_per_second']} docs/s is below {floor:.2f} "
+                           f"(baseline {baseline['docs_per_second']})")
+    ceiling = baseline["peak_rss_mb"] * (1 + thresholds["peak_rss_mb"])
+    if result["peak_rss_mb"] > ceiling:
+        regressions.append(f"peak RSS {result['peak_rss_mb']} MB is above {ceiling:.1f} MB "
+                           f"(baseline {baseline['peak_rss_mb']})")
+    for stage, base in baseline["stages"].items():
+        current = result["stages"].get(stage)
+        if current is None or max(base["p95"], current["p95"]) < MIN_LATENCY:
+            continue
+        ceiling = max(base["p95"], MIN_LATENCY) * (1 + thresholds["latency"])
+        if current["p95"] > ceiling:
+            regressions.append(f"{stage} p95 {current['p95'] * 1000:.1f} ms is above {ceiling * 1000:.1f} ms "
+                               f"(baseline {base['p95'] * 1000:.1f} ms)")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Offline crawl-to-dataset benchmark against a local stand-in corpus")
+    parser.add_argument("--pages", type=int, default=40)
+    parser.add_argument("--pdfs", type=int, default=4)
+    parser.add_argument("--sections", type=int, default=4)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=3, help="runs to take the best of")
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument("--update-baseline", action="store_true", help="store this run as the new baseline")
+    parser.add_argument("--output", help="also write this run's results here")
+    parser.add_argument("--max-throughput-drop", type=float, default=THRESHOLDS["docs_per_second"])
+    parser.add_argument("--max-latency-growth", type=float, default=THRESHOLDS["latency"])
+    parser.add_argument("--max-rss-growth", type=float, default=THRESHOLDS["peak_rss_mb"])
+    args = parser.parse_args(argv)
+
+    result = run_benchmark(args.pages, args.pdfs, args.sections, args.seed, args.repeat)
+    print(json.dumps(result, indent=2))
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(result, f, indent=2)
+    if args.update_baseline or not os.path.exists(args.baseline):
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(result, f, indent=2)
+        print(f"📌 Baseline written to {args.baseline}")
+        return 0
+
+    with open(args.baseline, "r", encoding="utf-8") as f:
+        baseline = json.load(f)
+    if baseline["corpus"] != result["corpus"]:
+        print(f"⚠️ Baseline was recorded on a different corpus: {baseline['corpus']}")
+    regressions = compare(result, baseline, {"docs_per_second": args.max_throughput_drop,
+                                             "latency": args.max_latency_growth,
+                                             "peak_rss_mb": args.max_rss_growth})
+    for message in regressions:
+        print(f"❌ Regression: {message}")
+    if not regressions:
+        print("✅ No regressions against the baseline")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
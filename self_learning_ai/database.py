@@ -0,0 +1,45 @@
+import os
+import sqlite3
+import threading
+
+_open = {}
+_open_lock = threading.Lock()
+
+
+class Database:
+    # One SQLite connection and lock per file, shared by every store opened on that path.
+    # The frontier keeps a write transaction open for a whole fetch batch, so a second
+    # connection to the same file (the fetch cache's) would stall on SQLite's busy timeout.
+
+    def __init__(self, path, key=None):
+        self.path = path
+        self.key = key
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.users = 1
+
+    def release(self):
+        with _open_lock:
+            self.users -= 1
+            if self.users:
+                return
+            _open.pop(self.key, None)
+        with self.lock:
+            self.conn.commit()
+            self.conn.close()
+
+
+def open_database(path):
+    # ":memory:" databases are private to their opener
+    if path == ":memory:":
+        return Database(path)
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    key = os.path.realpath(path)
+    with _open_lock:
+        db = _open.get(key)
+        if db is None:
+            db = _open[key] = Database(path, key)
+        else:
+            db.users += 1
+    return db
@@ -0,0 +1,355 @@
+import argparse
+import bisect
+import glob
+import gzip
+import hashlib
+import json
+import mmap
+import os
+
+DATASET_DIR = os.path.join("data", "fine_tune")
+MANIFEST = "manifest.json"
+MAX_SHARD_BYTES = 64 * 1024 * 1024
+COMPRESSION_SUFFIX = {None: "", "gzip": ".gz", "zstd": ".zst"}
+
+
+def record_hash(record):
+    # Content hash of the training pair itself, so metadata never defeats dedup
+    payload = json.dumps([record.get("input"), record.get("output")], ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def _zstd():
+    try:
+        import zstandard
+    except ImportError:
+        raise RuntimeError("zstd compression needs the zstandard package (pip install zstandard)")
+    return zstandard
+
+
+def _compress(data, compression):
+    if compression == "gzip":
+        return gzip.compress(data)
+    if compression == "zstd":
+        return _zstd().ZstdCompressor().compress(data)
+    return data
+
+
+def _decompress(data, compression):
+    if compression == "gzip":
+        return gzip.decompress(data)
+    if compression == "zstd":
+        return _zstd().ZstdDecompressor().decompress(data)
+    return data
+
+
+def _write_atomic(path, data):
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+def load_manifest(root):
+    path = os.path.join(root, MANIFEST)
+    if not os.path.exists(path):
+        return {"version": 2, "shards": []}
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _index_line(offset, length, digest):
+    return f"{offset} {length} {digest}\n"
+
+
+def read_index(path):
+    # A shard index's [offset, length, hash] entries and the bytes they span; a torn last line is ignored
+    entries, size = [], 0
+    if not os.path.exists(path):
+        return entries, size
+    with open(path, "rb") as f:
+        for line in f:
+            fields = line.split()
+            if not line.endswith(b"\n") or len(fields) != 3:
+                break
+            entries.append([int(fields[0]), int(fields[1]), fields[2].decode("ascii")])
+            size += len(line)
+    return entries, size
+
+
+class DatasetWriter:
+    # Appends training pairs to size-rotated JSONL shards. Beside each shard an index lists its
+    # records' offsets, lengths and hashes; it is appended to, after the data is fsynced, while the
+    # shard is active and never changes once the shard is sealed. A record exists once its shard's
+    # index names it. The manifest only lists shards and is replaced atomically when one is started
+    # or sealed. Full shards are sealed, compressed via temp file plus rename.
+
+    def __init__(self, root=DATASET_DIR, max_shard_bytes=MAX_SHARD_BYTES, compression=None, flush_every=32):
+        if compression not in COMPRESSION_SUFFIX:
+            raise ValueError(f"Unknown compression: {compression}")
+        if compression == "zstd":
+            _zstd()
+        self.root = root
+        self.max_shard_bytes = max_shard_bytes
+        self.compression = compression
+        self.flush_every = flush_every
+        os.makedirs(root, exist_ok=True)
+        self.manifest = load_manifest(root)
+        self._file = None
+        self._index = None
+        self._pending = []
+        self._records = 0
+        if self.manifest["version"] < 2:
+            self._upgrade()
+        self._hashes = set()
+        for shard in self.manifest["shards"]:
+            self._hashes.update(digest for *_, digest in read_index(os.path.join(root, shard["index"]))[0])
+        self._recover()
+
+    def _upgrade(self):
+        # Version 1 manifests listed every record inline; move them into per-shard indexes
+        for shard in self.manifest["shards"]:
+            shard["index"] = shard["name"].split(".")[0] + ".idx"
+            records = shard.pop("records")
+            _write_atomic(os.path.join(self.root, shard["index"]),
+                          "".join(_index_line(*record) for record in records).encode("ascii"))
+            if shard["sealed"]:
+                shard["records"] = len(records)
+        self.manifest["version"] = 2
+        self._save_manifest()
+
+    def _active(self):
+        shards = self.manifest["shards"]
+        return shards[-1] if shards and not shards[-1]["sealed"] else None
+
+    def _recover(self):
+        # Adopt complete lines a crashed writer appended but never indexed, drop torn tails of both files
+        shard = self._active()
+        if shard is None:
+            return
+        path = os.path.join(self.root, shard["name"])
+        index_path = os.path.join(self.root, shard["index"])
+        for name in (path, index_path):
+            if not os.path.exists(name):
+                open(name, "wb").close()
+        entries, size = read_index(index_path)
+        with open(index_path, "r+b") as f:
+            f.truncate(size)
+        self._records = len(entries)
+        end = entries[-1][0] + entries[-1][1] if entries else 0
+        with open(path, "r+b") as f:
+            f.seek(end)
+            for line in iter(f.readline, b""):
+                if not line.endswith(b"\n"):
+                    break
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    break
+                digest = record_hash(record)
+                if digest not in self._hashes:
+                    self._hashes.add(digest)
+                    self._pending.append(_index_line(end, len(line), digest))
+                end += len(line)
+            f.truncate(end)
+        self._open_active()
+        self.flush()
+
+    def _open_active(self):
+        shard = self._active()
+        if shard is None:
+            stem = f"shard-{len(self.manifest['shards']):05d}"
+            shard = {"name": stem + ".jsonl", "index": stem + ".idx", "sealed": False, "compression": None}
+            self.manifest["shards"].append(shard)
+            self._save_manifest()
+            self._records = 0
+        if self._file is None:
+            self._file = open(os.path.join(self.root, shard["name"]), "ab")
+            self._index = open(os.path.join(self.root, shard["index"]), "ab")
+        return shard
+
+    def append(self, record):
+        # Returns False when an identical pair is already stored
+        digest = record_hash(record)
+        if digest in self._hashes:
+            return False
+        self._open_active()
+        line = (json.dumps(record, ensure_ascii=False) + "\n").encode("utf-8")
+        offset = self._file.tell()
+        self._file.write(line)
+        self._pending.append(_index_line(offset, len(line), digest))
+        self._hashes.add(digest)
+        if offset + len(line) >= self.max_shard_bytes:
+            self.rotate()
+        elif len(self._pending) >= self.flush_every:
+            self.flush()
+        return True
+
+    def __contains__(self, record):
+        return record_hash(record) in self._hashes
+
+    def _save_manifest(self):
+        _write_atomic(os.path.join(self.root, MANIFEST), json.dumps(self.manifest).encode("utf-8"))
+
+    def flush(self):
+        # Data first, then its index entries, so an index never names bytes that are not on disk
+        if self._file is None:
+            return
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        if self._pending:
+            self._index.write("".join(self._pending).encode("ascii"))
+            self._index.flush()
+            os.fsync(self._index.fileno())
+            self._records += len(self._pending)
+            self._pending = []
+
+    def _close_files(self):
+        if self._file is not None:
+            self._file.close()
+            self._index.close()
+            self._file = self._index = None
+
+    def rotate(self):
+        shard = self._active()
+        if shard is None:
+            return
+        self.flush()
+        self._close_files()
+        if self.compression:
+            plain = os.path.join(self.root, shard["name"])
+            with open(plain, "rb") as f:
+                data = f.read()
+            name = shard["name"] + COMPRESSION_SUFFIX[self.compression]
+            _write_atomic(os.path.join(self.root, name), _compress(data, self.compression))
+            shard.update(name=name, compression=self.compression)
+        shard.update(sealed=True, records=self._records)
+        self._save_manifest()
+        if self.compression:
+            os.remove(plain)
+
+    def close(self):
+        self.flush()
+        self._close_files()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class DatasetReader:
+    # Streams or randomly accesses the records the shard indexes list; plain shards are mmapped.
+    # Sealed shards' indexes are only read when one of their records is.
+
+    def __init__(self, root=DATASET_DIR):
+        self.root = root
+        self.shards = load_manifest(root)["shards"]
+        self._indexes = {}
+        self._starts = []
+        total = 0
+        for shard_id, shard in enumerate(self.shards):
+            self._starts.append(total)
+            records = shard.get("records")
+            total += records if isinstance(records, int) else len(self._entries(shard_id))
+        self._total = total
+        self._maps = {}
+        self._blobs = {}
+
+    def _entries(self, shard_id):
+        shard = self.shards[shard_id]
+        if isinstance(shard.get("records"), list):
+            # Version 1 manifests list records inline
+            return shard["records"]
+        if shard_id not in self._indexes:
+            self._indexes[shard_id] = read_index(os.path.join(self.root, shard["index"]))[0]
+        return self._indexes[shard_id]
+
+    def __len__(self):
+        return self._total
+
+    def _buffer(self, shard_id):
+        shard = self.shards[shard_id]
+        if shard["compression"]:
+            if shard_id not in self._blobs:
+                with open(os.path.join(self.root, shard["name"]), "rb") as f:
+                    self._blobs = {shard_id: _decompress(f.read(), shard["compression"])}
+            return self._blobs[shard_id]
+        if shard_id not in self._maps:
+            with open(os.path.join(self.root, shard["name"]), "rb") as f:
+                self._maps[shard_id] = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        return self._maps[shard_id]
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += self._total
+        if not 0 <= index < self._total:
+            raise IndexError(index)
+        shard_id = bisect.bisect_right(self._starts, index) - 1
+        offset, length, _ = self._entries(shard_id)[index - self._starts[shard_id]]
+        return json.loads(self._buffer(shard_id)[offset:offset + length])
+
+    def iter(self, dedupe=False):
+        seen = set()
+        for shard_id in range(len(self.shards)):
+            entries = self._entries(shard_id)
+            if not entries:
+                continue
+            buffer = self._buffer(shard_id)
+            for offset, length, digest in entries:
+                if dedupe:
+                    if digest in seen:
+                        continue
+                    seen.add(digest)
+                yield json.loads(buffer[offset:offset + length])
+
+    def __iter__(self):
+        return self.iter()
+
+    def close(self):
+        for m in self._maps.values():
+            m.close()
+        self._maps.clear()
+        self._blobs.clear()
+        self._indexes.clear()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def migrate(root=DATASET_DIR, pattern="pair_*.json", delete=False, compression=None):
+    # Imports the old one-file-per-pair JSON files; duplicates are dropped by content hash
+    paths = sorted(glob.glob(os.path.join(root, pattern)))
+    added = 0
+    with DatasetWriter(root, compression=compression) as writer:
+        for path in paths:
+            with open(path, "r", encoding="utf-8") as f:
+                pair = json.load(f)
+            record = {"id": os.path.splitext(os.path.basename(path))[0],
+                      "input": pair.get("input", ""), "output": pair.get("output", "")}
+            added += writer.append(record)
+    if delete:
+        for path in paths:
+            os.remove(path)
+    print(f"📦 Imported {added} of {len(paths)} pairs into {root} ({len(paths) - added} duplicates)")
+    return added
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Fine-tune dataset shards")
+    commands = parser.add_subparsers(dest="command", required=True)
+    migrate_cmd = commands.add_parser("migrate", help="import pair_*.json files into JSONL shards")
+    migrate_cmd.add_argument("--root", default=DATASET_DIR)
+    migrate_cmd.add_argument("--pattern", default="pair_*.json")
+    migrate_cmd.add_argument("--compression", choices=["gzip", "zstd"])
+    migrate_cmd.add_argument("--delete", action="store_true", help="remove the JSON files after importing")
+    args = parser.parse_args()
+
+    if args.command == "migrate":
+        migrate(args.root, args.pattern, args.delete, args.compression)
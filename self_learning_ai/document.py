@@ -0,0 +1,99 @@
+import re
+from collections import Counter
+from functools import cached_property, lru_cache
+
+WORD = re.compile(r"[a-z0-9]+(?:'[a-z]+)?")
+FALLBACK_SENTENCE_END = re.compile(r"(?<=[.!?])\s+(?=[\"'(\[]?[A-Z0-9])")
+
+STOPWORDS = frozenset("""
+a about above after again against all also am an and any are as at be because been before being below
+between both but by can could did do does doing down during each few for from further had has have having
+he her here hers him his how i if in into is it its itself just me more most my no nor not now of off on
+once only or other our ours out over own same she should so some such than that the their theirs them then
+there these they this those through to too under until up very was we were what when where which while who
+whom why will with would you your yours
+""".split())
+
+
+@lru_cache(maxsize=1)
+def _sentence_splitter():
+    # nltk's punkt model when its data is installed, otherwise a punctuation-based split
+    try:
+        import nltk
+        from nltk.tokenize import sent_tokenize
+        nltk.data.find("tokenizers/punkt_tab/english/")
+        return sent_tokenize
+    except (ImportError, LookupError):
+        return FALLBACK_SENTENCE_END.split
+
+
+def split_sentences(text):
+    return [s.strip() for s in _sentence_splitter()(text) if s.strip()]
+
+
+def tokenize(sentence):
+    return WORD.findall(sentence.lower())
+
+
+class Document:
+    # A text plus its sentences, tokens and n-gram counts, each computed once and shared by every stage
+
+    def __init__(self, text, source=None):
+        self.text = text
+        self.source = source
+        self._ngrams = {}
+        self._top_terms = {}
+
+    @cached_property
+    def paragraphs(self):
+        return [p for p in self.text.split("\n\n") if p]
+
+    @cached_property
+    def sentences(self):
+        return split_sentences(self.text)
+
+    @cached_property
+    def sentence_tokens(self):
+        return [tokenize(sentence) for sentence in self.sentences]
+
+    @cached_property
+    def sentence_terms(self):
+        # Tokens without stopwords, used for term weighting
+        return [[t for t in tokens if t not in STOPWORDS] for tokens in self.sentence_tokens]
+
+    @cached_property
+    def tokens(self):
+        return [t for tokens in self.sentence_tokens for t in tokens]
+
+    @cached_property
+    def term_counts(self):
+        counts = Counter()
+        for terms in self.sentence_terms:
+            counts.update(terms)
+        return counts
+
+    @cached_property
+    def sentence_index(self):
+        # token -> ids of the sentences containing it
+        index = {}
+        for i, tokens in enumerate(self.sentence_tokens):
+            for token in set(tokens):
+                index.setdefault(token, []).append(i)
+        return index
+
+    def ngrams(self, n):
+        if n not in self._ngrams:
+            counts = Counter()
+            for tokens in self.sentence_tokens:
+                counts.update(zip(*(tokens[i:] for i in range(n))))
+            self._ngrams[n] = counts
+        return self._ngrams[n]
+
+    def top_terms(self, k=20):
+        if k not in self._top_terms:
+            self._top_terms[k] = [t for t, _ in self.term_counts.most_common(k)]
+        return self._top_terms[k]
+
+
+def as_document(value):
+    return value if isinstance(value, Document) else Document(value)
@@ -1,4 +1,84 @@
-def evaluate_summary(summary):
+import metrics
+from document import Document, as_document
+
+MIN_QUALITY = 0.35
+LCS_CANDIDATES = 3
+
+
+def _prf(overlap, candidate_total, reference_total):
+    precision = overlap / candidate_total if candidate_total else 0.0
+    recall = overlap / reference_total if reference_total else 0.0
+    f = 2 * precision * recall / (precision + recall) if precision + recall else 0.0
+    return {"precision": precision, "recall": recall, "f": f}
+
+
+def rouge_n(summary, source, n):
+    candidate = summary.ngrams(n)
+    reference = source.ngrams(n)
+    overlap = sum(min(count, reference[gram]) for gram, count in candidate.items())
+    return _prf(overlap, sum(candidate.values()), sum(reference.values()))
+
+
+def _lcs(a, b):
+    previous = [0] * (len(b) + 1)
+    for x in a:
+        current = [0]
+        for j, y in enumerate(b):
+            current.append(previous[j] + 1 if x == y else max(previous[j + 1], current[j]))
+        previous = current
+    return previous[-1]
+
+
+def rouge_l(summary, source):
+    # Summary-level LCS, matching each summary sentence only against the few source
+    # sentences that share the most tokens with it (looked up in the source's cached index)
+    index = source.sentence_index
+    total = 0
+    for tokens in summary.sentence_tokens:
+        shared = {}
+        for token in set(tokens):
+            for i in index.get(token, ()):
+                shared[i] = shared.get(i, 0) + 1
+        best = sorted(shared, key=shared.get, reverse=True)[:LCS_CANDIDATES]
+        total += max((_lcs(tokens, source.sentence_tokens[i]) for i in best), default=0)
+    return _prf(total, len(summary.tokens), len(source.tokens))
+
+
+def redundancy(summary):
+    # Share of repeated bigrams inside the summary
+    bigrams = summary.ngrams(2)
+    total = sum(bigrams.values())
+    return 1 - len(bigrams) / total if total else 0.0
+
+
+def coverage(summary, source, k=20):
+    top = source.top_terms(k)
+    if not top:
+        return 0.0
+    present = set(summary.tokens)
+    return sum(1 for t in top if t in present) / len(top)
+
+
+def score_summary(summary, source):
+    summary, source = as_document(summary), as_document(source)
+    scores = {
+        "rouge1": rouge_n(summary, source, 1),
+        "rouge2": rouge_n(summary, source, 2),
+        "rougeL": rouge_l(summary, source),
+        "compression": len(summary.tokens) / len(source.tokens) if source.tokens else 0.0,
+        "redundancy": redundancy(summary),
+        "coverage": coverage(summary, source),
+    }
+    faithfulness = (scores["rouge1"]["precision"] + scores["rouge2"]["precision"]
+                    + scores["rougeL"]["precision"]) / 3
+    quality = faithfulness * (0.5 + 0.5 * scores["coverage"]) * (1 - scores["redundancy"])
+    if len(summary.tokens) < 15 or scores["compression"] > 0.8:
+        quality *= 0.5
+    scores["quality"] = quality
+    return scores
+
+
+def _legacy_score(summary):
     score = 0
     if len(summary.split()) >= 20:
         score += 1
@@ -7,3 +87,11 @@ def evaluate_summary(summary):
     if any(word in summary.lower() for word in ['conclude', 'result', 'impact']):
         score += 1
     return score
+
+
+@metrics.instrumented("evaluate")
+def evaluate_summary(summary, source=None):
+    # Without a source only the old surface checks (0-3) are possible
+    if source is None:
+        return _legacy_score(summary.text if isinstance(summary, Document) else summary)
+    return round(score_summary(summary, source)["quality"], 3)
@@ -0,0 +1,98 @@
+import hashlib
+import json
+import os
+import time
+
+from database import open_database
+from urlnorm import normalize_url
+
+CACHE_PATH = os.path.join("data", "crawl.db")
+
+
+def content_digest(data):
+    if isinstance(data, str):
+        data = data.encode("utf-8")
+    return hashlib.sha256(data).hexdigest()
+
+
+class FetchCache:
+    # HTTP validators and content digests per normalized URL, kept in SQLite
+
+    def __init__(self, path=CACHE_PATH):
+        # Shares its connection with a Frontier opened on the same file
+        self._database = open_database(path)
+        self._lock = self._database.lock
+        self._db = self._database.conn
+        with self._lock:
+            self._create()
+
+    def _create(self):
+        self._db.execute("""
+            CREATE TABLE IF NOT EXISTS fetch_cache (
+                url TEXT PRIMARY KEY,
+                etag TEXT,
+                last_modified TEXT,
+                body_digest TEXT,
+                text_digest TEXT,
+                path TEXT,
+                links TEXT,
+                fetched_at REAL
+            )""")
+        self._db.execute("CREATE INDEX IF NOT EXISTS fetch_cache_text_digest ON fetch_cache (text_digest)")
+        self._db.commit()
+
+    def get(self, url):
+        with self._lock:
+            row = self._db.execute(
+                "SELECT etag, last_modified, body_digest, text_digest, path, links FROM fetch_cache WHERE url = ?",
+                (normalize_url(url),)).fetchone()
+        if row is None:
+            return None
+        etag, last_modified, body_digest, text_digest, path, links = row
+        return {
+            "etag": etag,
+            "last_modified": last_modified,
+            "body_digest": body_digest,
+            "text_digest": text_digest,
+            "path": path,
+            "links": json.loads(links) if links else [],
+        }
+
+    def conditional_headers(self, url):
+        entry = self.get(url)
+        headers = {}
+        if entry and entry["etag"]:
+            headers["If-None-Match"] = entry["etag"]
+        if entry and entry["last_modified"]:
+            headers["If-Modified-Since"] = entry["last_modified"]
+        return headers
+
+    def store(self, url, response, body_digest, text_digest=None, path=None, links=None):
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO fetch_cache VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (normalize_url(url), response.headers.get("ETag"), response.headers.get("Last-Modified"),
+                 body_digest, text_digest, path, json.dumps(links) if links is not None else None, time.time()))
+            self._db.commit()
+
+    def touch(self, url):
+        with self._lock:
+            self._db.execute("UPDATE fetch_cache SET fetched_at = ? WHERE url = ?", (time.time(), normalize_url(url)))
+            self._db.commit()
+
+    def has_text(self, text_digest, url):
+        # True when another URL already produced exactly this text
+        with self._lock:
+            row = self._db.execute(
+                "SELECT 1 FROM fetch_cache WHERE text_digest = ? AND url != ? LIMIT 1",
+                (text_digest, normalize_url(url))).fetchone()
+        return row is not None
+
+    def close(self):
+        self._database.release()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,90 @@
+import threading
+import time
+from contextlib import contextmanager
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+
+import metrics
+
+USER_AGENT = "Mozilla/5.0 (compatible; niviskar-self-learning-ai/1.0)"
+
+
+class HostPool:
+    # Pooled keep-alive sessions with a concurrency cap and politeness delay per host
+
+    def __init__(self, per_host=2, delay=0.5):
+        self.per_host = per_host
+        self.delay = delay
+        self._lock = threading.Lock()
+        self._sessions = {}
+        self._slots = {}
+        self._next_start = {}
+
+    def _host(self, url):
+        host = urlparse(url).netloc.lower()
+        with self._lock:
+            if host not in self._sessions:
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.per_host)
+                session.mount("http://", adapter)
+                session.mount("https://", adapter)
+                session.headers["User-Agent"] = USER_AGENT
+                self._sessions[host] = session
+                self._slots[host] = threading.BoundedSemaphore(self.per_host)
+                self._next_start[host] = 0.0
+        return host
+
+    def _wait_turn(self, host):
+        # Space out request starts to the same host by `delay` seconds
+        with self._lock:
+            now = time.monotonic()
+            start = max(now, self._next_start[host])
+            self._next_start[host] = start + self.delay
+        if start > now:
+            time.sleep(start - now)
+
+    def _record(self, host, response, started, size):
+        # Latency covers the whole exchange, body included, so slow transfers show up per host
+        metrics.observe("http_request_seconds", time.perf_counter() - started, host=host)
+        metrics.inc("http_responses_total", host=host, status=response.status_code)
+        metrics.inc("http_bytes_total", size, host=host)
+
+    def get(self, url, **kwargs):
+        host = self._host(url)
+        with self._slots[host]:
+            self._wait_turn(host)
+            started = time.perf_counter()
+            response = self._sessions[host].get(url, **kwargs)
+            if metrics.enabled():
+                self._record(host, response, started, len(response.content))
+            return response
+
+    @contextmanager
+    def stream(self, url, **kwargs):
+        # Holds the host slot until the caller has finished reading the body
+        host = self._host(url)
+        with self._slots[host]:
+            self._wait_turn(host)
+            started = time.perf_counter()
+            response = self._sessions[host].get(url, stream=True, **kwargs)
+            try:
+                yield response
+            finally:
+                if metrics.enabled():
+                    # Bytes the caller actually read off the wire, before any decoding
+                    self._record(host, response, started, response.raw.tell())
+                response.close()
+
+    def close(self):
+        with self._lock:
+            for session in self._sessions.values():
+                session.close()
+            self._sessions.clear()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,278 @@
+import hashlib
+import os
+import time
+from collections import OrderedDict
+from urllib.parse import urlsplit
+from urllib.robotparser import RobotFileParser
+
+from database import open_database
+from urlnorm import normalize_url
+
+FRONTIER_PATH = os.path.join("data", "crawl.db")
+ROBOTS_TTL = 24 * 3600
+MIN_INTERVAL = 3600
+MAX_INTERVAL = 7 * 24 * 3600
+# The seen-set bitmap is megabytes, so it is written every this many commits and on close
+BLOOM_SAVE_EVERY = 50
+
+
+class BloomFilter:
+    # Fixed-size seen-set: memory stays flat however many URLs the crawl meets
+
+    def __init__(self, size_bits=1 << 25, hashes=7):
+        self.size_bits = size_bits
+        self.hashes = hashes
+        self.bits = bytearray(size_bits // 8)
+
+    def _positions(self, item):
+        digest = hashlib.blake2b(item.encode("utf-8"), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        return [(h1 + i * h2) % self.size_bits for i in range(self.hashes)]
+
+    def add(self, item):
+        # Returns True when the item was not in the set yet
+        added = False
+        for pos in self._positions(item):
+            byte, bit = divmod(pos, 8)
+            if not self.bits[byte] & (1 << bit):
+                self.bits[byte] |= 1 << bit
+                added = True
+        return added
+
+    def __contains__(self, item):
+        return all(self.bits[pos // 8] & (1 << (pos % 8)) for pos in self._positions(item))
+
+    def save(self, path):
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(self.bits)
+        os.replace(tmp_path, path)
+
+    def load(self, path):
+        with open(path, "rb") as f:
+            data = f.read()
+        if len(data) != len(self.bits):
+            return False
+        self.bits[:] = data
+        return True
+
+
+class Frontier:
+    # Persistent crawl queue in SQLite, prioritised by depth, freshness and host
+
+    def __init__(self, path=FRONTIER_PATH, max_depth=3, bloom_bits=1 << 25, robots=True):
+        self.path = path
+        self.max_depth = max_depth
+        self.robots = robots
+        self._parsers = OrderedDict()
+        # Shares its connection with a FetchCache opened on the same file
+        self._database = open_database(path)
+        self._lock = self._database.lock
+        self._db = self._database.conn
+        with self._lock:
+            self._create()
+
+        self.seen = BloomFilter(bloom_bits)
+        self._commits = 0
+        bloom_path = path + ".bloom"
+        saved_upto = 0
+        if path != ":memory:" and os.path.exists(bloom_path) and self.seen.load(bloom_path):
+            saved_upto = self._bloom_mark()
+        # A bitmap saved a few commits back only lacks the URLs queued since; add those
+        with self._lock:
+            for (url,) in self._db.execute("SELECT url FROM frontier WHERE rowid > ?", (saved_upto,)):
+                self.seen.add(url)
+
+    def _create(self):
+        self._db.execute("""
+            CREATE TABLE IF NOT EXISTS frontier (
+                url TEXT PRIMARY KEY,
+                host TEXT,
+                depth INTEGER,
+                status TEXT DEFAULT 'pending',
+                next_fetch REAL DEFAULT 0,
+                interval REAL DEFAULT 0,
+                last_fetched REAL,
+                failures INTEGER DEFAULT 0
+            )""")
+        # Frontiers from before failure backoff lack the column
+        if "failures" not in {row[1] for row in self._db.execute("PRAGMA table_info(frontier)")}:
+            self._db.execute("ALTER TABLE frontier ADD COLUMN failures INTEGER DEFAULT 0")
+        self._db.execute("CREATE INDEX IF NOT EXISTS frontier_due ON frontier (depth, next_fetch)")
+        self._db.execute("""
+            CREATE TABLE IF NOT EXISTS robots (
+                host TEXT PRIMARY KEY,
+                body TEXT,
+                fetched_at REAL
+            )""")
+        self._db.execute("CREATE TABLE IF NOT EXISTS frontier_meta (key TEXT PRIMARY KEY, value INTEGER)")
+        # Anything a killed process left in flight or held for retry goes back on the queue
+        self._db.execute("UPDATE frontier SET status = 'pending' WHERE status IN ('in_flight', 'retry')")
+        self._db.commit()
+
+    def add(self, url, depth):
+        if depth > self.max_depth:
+            return False
+        try:
+            key = normalize_url(url)
+        except ValueError:
+            return False
+        with self._lock:
+            if not self.seen.add(key):
+                return False
+            self._db.execute("INSERT OR IGNORE INTO frontier (url, host, depth) VALUES (?, ?, ?)",
+                             (key, urlsplit(key).netloc, depth))
+        return True
+
+    def add_seeds(self, urls):
+        for url in urls:
+            self.add(url, 0)
+        self.commit()
+
+    def next_batch(self, size):
+        # Take due URLs shallowest first, then round-robin across hosts
+        now = time.time()
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT url, depth, host FROM frontier WHERE status IN ('pending', 'done') AND next_fetch <= ? "
+                "ORDER BY depth, next_fetch, rowid LIMIT ?", (now, size * 4)).fetchall()
+            by_host = OrderedDict()
+            for url, depth, host in rows:
+                by_host.setdefault(host, []).append((url, depth))
+            batch = []
+            while len(batch) < size and by_host:
+                for host in list(by_host):
+                    batch.append(by_host[host].pop(0))
+                    if not by_host[host]:
+                        del by_host[host]
+                    if len(batch) >= size:
+                        break
+            self._db.executemany("UPDATE frontier SET status = 'in_flight' WHERE url = ?", [(u,) for u, _ in batch])
+            self._db.commit()
+        return batch
+
+    def complete(self, url, changed=True, failed=False):
+        # Pages that keep changing are revisited sooner, stable ones less often. A failed fetch is
+        # retried after MIN_INTERVAL, doubling with each failure in a row, and leaves the page's
+        # revisit interval as it was.
+        now = time.time()
+        key = normalize_url(url)
+        with self._lock:
+            row = self._db.execute("SELECT interval, failures FROM frontier WHERE url = ?", (key,)).fetchone()
+            if failed:
+                failures = (row[1] or 0) + 1 if row else 1
+                delay = min(MAX_INTERVAL, MIN_INTERVAL * 2 ** (failures - 1))
+                self._db.execute("UPDATE frontier SET status = 'done', next_fetch = ?, failures = ? WHERE url = ?",
+                                 (now + delay, failures, key))
+                return
+            interval = row[0] if row and row[0] else MIN_INTERVAL * 6
+            if changed:
+                interval = max(MIN_INTERVAL, interval / 2)
+            else:
+                interval = min(MAX_INTERVAL, interval * 2)
+            self._db.execute(
+                "UPDATE frontier SET status = 'done', last_fetched = ?, next_fetch = ?, interval = ?, failures = 0 "
+                "WHERE url = ?", (now, now + interval, interval, key))
+
+    def retry(self, url):
+        # For a URL whose article a later stage lost: held back until requeue(), so the
+        # crawl that produced it does not fetch it again straight away
+        with self._lock:
+            self._db.execute("UPDATE frontier SET status = 'retry', next_fetch = 0 WHERE url = ?",
+                             (normalize_url(url),))
+
+    def requeue(self):
+        # Called as a crawl starts: URLs held for retry are due again, as are any an aborted crawl left in flight
+        with self._lock:
+            self._db.execute("UPDATE frontier SET status = 'pending' WHERE status IN ('in_flight', 'retry')")
+
+    def block(self, url):
+        with self._lock:
+            self._db.execute("UPDATE frontier SET status = 'blocked' WHERE url = ?", (normalize_url(url),))
+
+    def allowed(self, url, pool, user_agent="*"):
+        if not self.robots:
+            return True
+        parts = urlsplit(normalize_url(url))
+        host = parts.netloc
+        with self._lock:
+            parser = self._parsers.get(host)
+            if parser is not None:
+                self._parsers.move_to_end(host)
+            else:
+                row = self._db.execute("SELECT body, fetched_at FROM robots WHERE host = ?", (host,)).fetchone()
+        if parser is None:
+            if row and time.time() - row[1] < ROBOTS_TTL:
+                body = row[0]
+            else:
+                body = self._fetch_robots(f"{parts.scheme}://{host}/robots.txt", pool)
+            parser = RobotFileParser()
+            parser.parse(body.splitlines())
+            with self._lock:
+                self._parsers[host] = parser
+                if len(self._parsers) > 256:
+                    self._parsers.popitem(last=False)
+        return parser.can_fetch(user_agent, url)
+
+    def _fetch_robots(self, robots_url, pool):
+        try:
+            res = pool.get(robots_url, timeout=10)
+            if res.status_code == 200:
+                body = res.text
+            elif res.status_code in (401, 403):
+                body = "User-agent: *\nDisallow: /"
+            else:
+                body = ""
+        except Exception as e:
+            print(f"⚠️ Could not fetch {robots_url}: {e}")
+            return ""
+        with self._lock:
+            self._db.execute("INSERT OR REPLACE INTO robots VALUES (?, ?, ?)",
+                             (urlsplit(robots_url).netloc, body, time.time()))
+        return body
+
+    def pending(self):
+        with self._lock:
+            return self._db.execute(
+                "SELECT COUNT(*) FROM frontier WHERE status IN ('pending', 'done', 'retry') AND next_fetch <= ?",
+                (time.time(),)).fetchone()[0]
+
+    def next_due(self):
+        # Earliest time any queued URL becomes due, or None when nothing is queued
+        with self._lock:
+            return self._db.execute(
+                "SELECT MIN(next_fetch) FROM frontier WHERE status IN ('pending', 'done', 'retry')").fetchone()[0]
+
+    def _bloom_mark(self):
+        # Highest frontier rowid the saved bitmap covers
+        with self._lock:
+            row = self._db.execute("SELECT value FROM frontier_meta WHERE key = 'bloom_rowid'").fetchone()
+        return row[0] if row else 0
+
+    def _save_bloom(self):
+        if self.path == ":memory:":
+            return
+        with self._lock:
+            self._db.commit()
+            mark = self._db.execute("SELECT COALESCE(MAX(rowid), 0) FROM frontier").fetchone()[0]
+            self.seen.save(self.path + ".bloom")
+            self._db.execute("INSERT OR REPLACE INTO frontier_meta VALUES ('bloom_rowid', ?)", (mark,))
+            self._db.commit()
+
+    def commit(self):
+        with self._lock:
+            self._db.commit()
+            self._commits += 1
+        if self._commits % BLOOM_SAVE_EVERY == 0:
+            self._save_bloom()
+
+    def close(self):
+        self._save_bloom()
+        self._database.release()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,120 @@
+import codecs
+import hashlib
+from html.parser import HTMLParser
+from urllib.parse import urljoin
+
+from bs4 import BeautifulSoup
+
+SKIP_TAGS = {"script", "style", "nav", "header", "footer"}
+CHUNK_SIZE = 64 * 1024
+
+
+def _join(base_url, href):
+    # None for an href urljoin cannot parse (e.g. "http://[oops/"), so one bad anchor costs only itself
+    try:
+        return urljoin(base_url, href)
+    except ValueError:
+        return None
+
+
+class PageExtractor(HTMLParser):
+    # Collects links and visible text in one pass over fed chunks, dropping boilerplate subtrees
+
+    def __init__(self, base_url="", want_text=True):
+        super().__init__(convert_charrefs=True)
+        self.base_url = base_url
+        self.want_text = want_text
+        self.links = []
+        self._strings = []
+        self._pending = []
+        self._skip = 0
+
+    def _flush(self):
+        # A text node can arrive over several handle_data calls when it spans two chunks
+        if self._pending:
+            text = "".join(self._pending).strip()
+            if text:
+                self._strings.append(text)
+            self._pending = []
+
+    def handle_starttag(self, tag, attrs):
+        self._flush()
+        if tag == "a":
+            href = dict(attrs).get("href")
+            link = _join(self.base_url, href) if href is not None else None
+            if link is not None:
+                self.links.append(link)
+        if tag in SKIP_TAGS:
+            self._skip += 1
+
+    def handle_endtag(self, tag):
+        self._flush()
+        if tag in SKIP_TAGS and self._skip:
+            self._skip -= 1
+
+    def handle_comment(self, data):
+        self._flush()
+
+    def handle_decl(self, decl):
+        self._flush()
+
+    def handle_data(self, data):
+        if self.want_text and not self._skip:
+            self._pending.append(data)
+
+    def close(self):
+        super().close()
+        self._flush()
+
+    def text(self):
+        return " ".join(self._strings)
+
+
+def extract_with_soup(html, base_url="", want_text=True):
+    # Full-tree fallback, slower but tolerant of anything html.parser chokes on
+    soup = BeautifulSoup(html, "html.parser")
+    links = [link for link in (_join(base_url, a["href"]) for a in soup.find_all("a", href=True)) if link is not None]
+    if not want_text:
+        return links, None
+    for element in soup.find_all(list(SKIP_TAGS)):
+        element.decompose()
+    return links, soup.get_text(separator=" ", strip=True)
+
+
+def extract_html(html, base_url="", want_text=True, parser="stream"):
+    if parser == "bs4":
+        return extract_with_soup(html, base_url, want_text)
+    extractor = PageExtractor(base_url, want_text)
+    extractor.feed(html)
+    extractor.close()
+    return extractor.links, extractor.text() if want_text else None
+
+
+def _decoder(encoding):
+    try:
+        return codecs.getincrementaldecoder(encoding or "utf-8")(errors="replace")
+    except LookupError:
+        return codecs.getincrementaldecoder("utf-8")(errors="replace")
+
+
+def extract_response(response, base_url="", want_text=True, parser="stream", chunk_size=CHUNK_SIZE):
+    # Parses a streamed response as it arrives; returns (links, text, sha256 of the body)
+    digest = hashlib.sha256()
+    decoder = _decoder(response.encoding)
+
+    if parser == "bs4":
+        parts = []
+        for chunk in response.iter_content(chunk_size):
+            digest.update(chunk)
+            parts.append(decoder.decode(chunk))
+        parts.append(decoder.decode(b"", final=True))
+        links, text = extract_with_soup("".join(parts), base_url, want_text)
+        return links, text, digest.hexdigest()
+
+    extractor = PageExtractor(base_url, want_text)
+    for chunk in response.iter_content(chunk_size):
+        digest.update(chunk)
+        extractor.feed(decoder.decode(chunk))
+    extractor.feed(decoder.decode(b"", final=True))
+    extractor.close()
+    return extractor.links, extractor.text() if want_text else None, digest.hexdigest()
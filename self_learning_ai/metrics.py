@@ -0,0 +1,244 @@
+import bisect
+import functools
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+
+METRICS_DIR = os.path.join("data", "metrics")
+PREFIX = "self_learning_"
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+DEPTH_BUCKETS = (0, 1, 2, 4, 8, 16, 32, 64, 128)
+
+_enabled = os.environ.get("SELF_LEARNING_METRICS", "0") == "1"
+_NOOP = nullcontext()
+
+
+def enable(flag=True):
+    global _enabled
+    _enabled = flag
+
+
+def enabled():
+    return _enabled
+
+
+def _key(name, labels):
+    return name, tuple(sorted(labels.items()))
+
+
+class Registry:
+    # Counters, gauges and fixed-bucket histograms keyed by (name, sorted labels).
+    # With keep_samples every observed value is also kept, for exact percentiles in benchmarks.
+
+    def __init__(self, keep_samples=False):
+        self._lock = threading.Lock()
+        self.keep_samples = keep_samples
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.counters = {}
+            self.gauges = {}
+            self.histograms = {}
+            self.samples = {}
+
+    def inc(self, name, value=1, **labels):
+        key = _key(name, labels)
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def set(self, name, value, **labels):
+        with self._lock:
+            self.gauges[_key(name, labels)] = value
+
+    def observe(self, name, value, buckets=LATENCY_BUCKETS, **labels):
+        key = _key(name, labels)
+        with self._lock:
+            hist = self.histograms.get(key)
+            if hist is None:
+                hist = self.histograms[key] = {"buckets": list(buckets), "counts": [0] * (len(buckets) + 1),
+                                               "sum": 0.0, "count": 0}
+            hist["counts"][bisect.bisect_left(hist["buckets"], value)] += 1
+            hist["sum"] += value
+            hist["count"] += 1
+            if self.keep_samples:
+                self.samples.setdefault(key, []).append(value)
+
+    def snapshot(self):
+        # Plain, picklable copy; worker processes send these back to be merged
+        with self._lock:
+            return {
+                "counters": list(self.counters.items()),
+                "gauges": list(self.gauges.items()),
+                "histograms": [(k, dict(v, counts=list(v["counts"]))) for k, v in self.histograms.items()],
+                "samples": [(k, list(v)) for k, v in self.samples.items()],
+            }
+
+    def merge(self, snapshot):
+        with self._lock:
+            for key, value in snapshot["counters"]:
+                self.counters[key] = self.counters.get(key, 0) + value
+            for key, value in snapshot["gauges"]:
+                self.gauges[key] = value
+            for key, other in snapshot["histograms"]:
+                hist = self.histograms.get(key)
+                if hist is None:
+                    self.histograms[key] = dict(other, counts=list(other["counts"]))
+                    continue
+                hist["counts"] = [a + b for a, b in zip(hist["counts"], other["counts"])]
+                hist["sum"] += other["sum"]
+                hist["count"] += other["count"]
+            for key, values in snapshot.get("samples", ()):
+                if self.keep_samples:
+                    self.samples.setdefault(key, []).extend(values)
+
+    def to_prometheus(self):
+        lines = []
+        with self._lock:
+            for kind, series in (("counter", self.counters), ("gauge", self.gauges)):
+                for name in sorted({k[0] for k in series}):
+                    lines.append(f"# TYPE {PREFIX}{name} {kind}")
+                    for (n, labels), value in sorted(series.items()):
+                        if n == name:
+                            lines.append(f"{PREFIX}{name}{_labels(labels)} {value}")
+            for name in sorted({k[0] for k in self.histograms}):
+                lines.append(f"# TYPE {PREFIX}{name} histogram")
+                for (n, labels), hist in sorted(self.histograms.items()):
+                    if n != name:
+                        continue
+                    cumulative = 0
+                    for bound, count in zip(hist["buckets"] + ["+Inf"], hist["counts"]):
+                        cumulative += count
+                        lines.append(f"{PREFIX}{name}_bucket{_labels(labels + (('le', bound),))} {cumulative}")
+                    lines.append(f"{PREFIX}{name}_sum{_labels(labels)} {hist['sum']}")
+                    lines.append(f"{PREFIX}{name}_count{_labels(labels)} {hist['count']}")
+        return "\n".join(lines) + "\n"
+
+
+def _labels(labels):
+    if not labels:
+        return ""
+    escaped = (str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, v in labels)
+    return "{" + ",".join(f'{k}="{v}"' for (k, _), v in zip(labels, escaped)) + "}"
+
+
+REGISTRY = Registry()
+
+
+# Module-level helpers return straight away while metrics are disabled
+
+def inc(name, value=1, **labels):
+    if _enabled:
+        REGISTRY.inc(name, value, **labels)
+
+
+def set_gauge(name, value, **labels):
+    if _enabled:
+        REGISTRY.set(name, value, **labels)
+
+
+def observe(name, value, buckets=LATENCY_BUCKETS, **labels):
+    if _enabled:
+        REGISTRY.observe(name, value, buckets, **labels)
+
+
+@contextmanager
+def _timer(name, labels):
+    started = time.perf_counter()
+    try:
+        yield
+    except Exception:
+        REGISTRY.inc("stage_errors_total", **labels)
+        raise
+    finally:
+        REGISTRY.observe(name, time.perf_counter() - started, **labels)
+
+
+def timed(stage, name="stage_seconds"):
+    # `with timed("clean"):` records a duration and any error for the stage
+    return _timer(name, {"stage": stage}) if _enabled else _NOOP
+
+
+def instrumented(stage):
+    # Decorator form of timed(); when disabled it costs one flag check per call
+    def decorate(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return fn(*args, **kwargs)
+            with _timer("stage_seconds", {"stage": stage}):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def _stage_totals(snapshot):
+    stages = {}
+    for (name, labels), hist in snapshot["histograms"]:
+        if name == "stage_seconds":
+            stage = dict(labels)["stage"]
+            stages[stage] = {"calls": hist["count"], "seconds": round(hist["sum"], 6)}
+    for (name, labels), value in snapshot["counters"]:
+        if name == "stage_errors_total":
+            stages.setdefault(dict(labels)["stage"], {"calls": 0, "seconds": 0.0})["errors"] = value
+    return stages
+
+
+def _host_totals(snapshot):
+    hosts = {}
+    for (name, labels), hist in snapshot["histograms"]:
+        if name == "http_request_seconds":
+            host = hosts.setdefault(dict(labels)["host"], {"requests": 0, "bytes": 0})
+            host["requests"] = hist["count"]
+            host["mean_latency"] = round(hist["sum"] / hist["count"], 6) if hist["count"] else 0.0
+    for (name, labels), value in snapshot["counters"]:
+        if name == "http_bytes_total":
+            hosts.setdefault(dict(labels)["host"], {"requests": 0, "bytes": 0})["bytes"] += value
+    return hosts
+
+
+def _diff(before, after):
+    # Counters and histograms are cumulative, so a cycle's share is after minus before
+    counters = dict(before["counters"])
+    histograms = dict(before["histograms"])
+    diffed_counters = [(k, v - counters.get(k, 0)) for k, v in after["counters"]]
+    diffed_histograms = []
+    for key, hist in after["histograms"]:
+        old = histograms.get(key)
+        if old:
+            hist = dict(hist, counts=[a - b for a, b in zip(hist["counts"], old["counts"])],
+                        sum=hist["sum"] - old["sum"], count=hist["count"] - old["count"])
+        diffed_histograms.append((key, hist))
+    return {"counters": diffed_counters, "gauges": after["gauges"], "histograms": diffed_histograms, "samples": []}
+
+
+def cycle_summary(before, elapsed, **fields):
+    delta = _diff(before, REGISTRY.snapshot())
+    documents = fields.get("articles", 0)
+    return dict(fields, seconds=round(elapsed, 3),
+                docs_per_second=round(documents / elapsed, 3) if elapsed else 0.0,
+                bytes_downloaded=sum(v for (n, _), v in delta["counters"] if n == "http_bytes_total"),
+                stages=_stage_totals(delta), hosts=_host_totals(delta))
+
+
+def log_event(event, metrics_dir=METRICS_DIR, **fields):
+    # One JSON object per line in metrics.jsonl
+    if not _enabled:
+        return
+    os.makedirs(metrics_dir, exist_ok=True)
+    record = dict(fields, event=event, ts=round(time.time(), 3))
+    with open(os.path.join(metrics_dir, "metrics.jsonl"), "a", encoding="utf-8") as f:
+        f.write(json.dumps(record) + "\n")
+
+
+def write_prometheus(metrics_dir=METRICS_DIR):
+    # Text exposition format, replaced atomically for node_exporter's textfile collector
+    if not _enabled:
+        return
+    os.makedirs(metrics_dir, exist_ok=True)
+    path = os.path.join(metrics_dir, "pipeline.prom")
+    with open(path + ".tmp", "w", encoding="utf-8") as f:
+        f.write(REGISTRY.to_prometheus())
+    os.replace(path + ".tmp", path)
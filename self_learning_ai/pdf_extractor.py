@@ -0,0 +1,117 @@
+import hashlib
+import multiprocessing
+import os
+import tempfile
+import threading
+from concurrent.futures import ProcessPoolExecutor, TimeoutError
+from concurrent.futures.process import BrokenProcessPool
+
+import PyPDF2
+
+import metrics
+
+MAX_PDF_BYTES = 50 * 1024 * 1024
+PDF_TIMEOUT = 60
+
+
+def iter_pdf_pages(source):
+    # Yields each page's text as soon as it is extracted; `source` is a path or file object
+    reader = PyPDF2.PdfReader(source)
+    for page in reader.pages:
+        text = page.extract_text()
+        if text:
+            yield text
+
+
+def extract_pdf_file(source):
+    pages = list(iter_pdf_pages(source))
+    return "\n".join(pages) + "\n" if pages else ""
+
+
+def spool_response(response, max_bytes=MAX_PDF_BYTES, chunk_size=64 * 1024):
+    # Streams a response body into a temp file; returns (path, sha256) or (None, None) past max_bytes
+    declared = response.headers.get("Content-Length")
+    if declared and declared.isdigit() and int(declared) > max_bytes:
+        return None, None
+
+    digest = hashlib.sha256()
+    total = 0
+    tmp = tempfile.NamedTemporaryFile(suffix=".pdf", delete=False)
+    try:
+        with tmp:
+            for chunk in response.iter_content(chunk_size):
+                total += len(chunk)
+                if total > max_bytes:
+                    raise ValueError("PDF exceeds byte cap")
+                digest.update(chunk)
+                tmp.write(chunk)
+    except ValueError:
+        os.remove(tmp.name)
+        return None, None
+    except Exception:
+        os.remove(tmp.name)
+        raise
+    return tmp.name, digest.hexdigest()
+
+
+class PdfExtractor:
+    # Runs PDF text extraction in worker processes so big documents never stall the crawl
+
+    def __init__(self, workers=2, timeout=PDF_TIMEOUT):
+        self.workers = workers
+        self.timeout = timeout
+        self._lock = threading.Lock()
+        self._pool = None
+
+    def _executor(self):
+        with self._lock:
+            if self._pool is None:
+                self._pool = ProcessPoolExecutor(max_workers=self.workers,
+                                                 mp_context=multiprocessing.get_context("spawn"))
+            return self._pool
+
+    def extract(self, path):
+        # Returns None when extraction failed, so callers must not treat the PDF as processed.
+        # Timed here in the parent; the worker processes keep no metrics of their own.
+        with metrics.timed("extract_pdf"):
+            for _ in range(2):
+                pool = self._executor()
+                try:
+                    return pool.submit(extract_pdf_file, path).result(timeout=self.timeout)
+                except TimeoutError:
+                    print(f"⏱️ PDF extraction timed out after {self.timeout}s: {path}")
+                    metrics.inc("pdf_timeouts_total")
+                    self._restart(pool)
+                    break
+                except BrokenProcessPool:
+                    # Another thread's timeout killed the pool under this PDF; try once on a fresh one
+                    self._restart(pool)
+                except Exception as e:
+                    print(f"❌ Error extracting PDF text: {e}")
+                    break
+            metrics.inc("stage_errors_total", stage="extract_pdf")
+            return None
+
+    def _restart(self, pool):
+        # A stuck worker cannot be cancelled, so kill the pool and start a fresh one on demand.
+        # Only the pool the caller used is replaced; a fresh one another thread started stays up.
+        with self._lock:
+            if self._pool is not pool:
+                return
+            self._pool = None
+        if pool is not None:
+            for process in list((pool._processes or {}).values()):
+                process.terminate()
+            pool.shutdown(wait=False, cancel_futures=True)
+
+    def close(self):
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -1,9 +1,15 @@
-import requests
-from bs4 import BeautifulSoup
 import os
-import PyPDF2
-from urllib.parse import urljoin, urlparse
+from urllib.parse import urlparse
 import io
+from concurrent.futures import ThreadPoolExecutor
+
+from fetch_cache import content_digest
+import metrics
+from fetcher import HostPool
+from frontier import Frontier
+from html_extract import extract_response
+from pdf_extractor import MAX_PDF_BYTES, PdfExtractor, extract_pdf_file, spool_response
+from urlnorm import normalize_url
 
 ALLOWED_EXTENSIONS = ['.pdf', '.txt', '.html']
 
@@ -31,84 +37,220 @@ URLS = [
     "https://www.khanacademy.org/computing/computer-science",
 ]
 
+@metrics.instrumented("extract_pdf")
 def extract_pdf_text(pdf_content):
+    # Accepts raw bytes or a path; each page is extracted once and joined at the end
     try:
-        pdf_file = io.BytesIO(pdf_content)
-        pdf_reader = PyPDF2.PdfReader(pdf_file)
-        text = ""
-        for page in pdf_reader.pages:
-            if page.extract_text():
-                text += page.extract_text() + "\n"
-        return text
+        source = io.BytesIO(pdf_content) if isinstance(pdf_content, bytes) else pdf_content
+        return extract_pdf_file(source)
     except Exception as e:
         print(f"❌ Error extracting PDF text: {e}")
         return None
 
-def fetch_open_edu_articles(urls=URLS, limit=3):
-    saved = []
+def _is_document(url):
+    return any(urlparse(url).path.lower().endswith(ext) for ext in ALLOWED_EXTENSIONS)
+
+def _is_navigation(url):
+    # Extension-less pages are only followed for the links on them
+    parts = urlparse(url)
+    return parts.scheme in ("http", "https") and not os.path.splitext(parts.path)[1]
+
+def _site(host):
+    # "www.example.org" and "example.org" are the same site
+    host = (host or "").lower()
+    return host[4:] if host.startswith("www.") else host
+
+def _on_site(url, sites):
+    # True when the URL's host is one of `sites` or a subdomain of one; unparseable URLs never are
+    try:
+        host = _site(urlparse(url).hostname)
+    except ValueError:
+        return False
+    return any(host == site or host.endswith("." + site) for site in sites)
 
-    for base_url in urls:
-        if len(saved) >= limit:
-            break
+def _fetch_pdf(pool, extractor, full_url, entry, headers, max_pdf_bytes):
+    print(f"📥 Downloading PDF: {full_url}")
+    with pool.stream(full_url, timeout=20, headers=headers) as response:
+        if response.status_code == 304 and entry:
+            return "unchanged", None, [], response, entry["body_digest"]
+        if response.status_code != 200:
+            return None, None, [], response, None
+        pdf_path, body_digest = spool_response(response, max_pdf_bytes)
+    if pdf_path is None:
+        print(f"⚠️ Skipping PDF larger than {max_pdf_bytes} bytes: {full_url}")
+        return None, None, [], None, None
+    try:
+        if entry and entry["body_digest"] == body_digest:
+            return "unchanged", None, [], response, body_digest
+        return "pdf", extractor.extract(pdf_path), [], response, body_digest
+    finally:
+        os.remove(pdf_path)
+
+@metrics.instrumented("fetch")
+def _fetch_page(pool, cache, frontier, extractor, max_pdf_bytes, html_parser, full_url, depth):
+    # Returns (kind, content, links, response, body_digest); kind is "unchanged" when the cache says nothing moved
+    try:
+        if not frontier.allowed(full_url, pool):
+            return "blocked", None, [], None, None
+        entry = cache.get(full_url) if cache else None
+        headers = cache.conditional_headers(full_url) if cache else {}
+        if urlparse(full_url).path.lower().endswith('.pdf'):
+            return _fetch_pdf(pool, extractor, full_url, entry, headers, max_pdf_bytes)
+        if depth == 0:
+            print(f"🔍 Scanning {full_url}")
+
+        want_text = depth > 0 and _is_document(full_url)
+        with pool.stream(full_url, timeout=10, headers=headers) as response:
+            if response.status_code == 304 and entry:
+                return "unchanged", None, entry["links"], response, entry["body_digest"]
+            if response.status_code != 200:
+                return None, None, [], response, None
+            links, content, body_digest = extract_response(response, full_url, want_text, html_parser)
+
+        if entry and entry["body_digest"] == body_digest:
+            return "unchanged", None, entry["links"], response, body_digest
+        if not want_text:
+            return "page", None, links, response, body_digest
+        return "html", content if len(content) > 500 else None, links, response, body_digest
+    except Exception as e:
+        print(f"❌ Error processing {full_url}: {str(e)}")
+    return None, None, [], None, None
 
-        try:
-            print(f"🔍 Scanning {base_url}")
-            res = requests.get(base_url, timeout=10)
-            soup = BeautifulSoup(res.text, "html.parser")
+def _recorder(cache, frontier, full_url, response, body_digest, text_digest, path, links):
+    # record(True) once the article has been handled: only then does the cache learn its text and
+    # validators, so later cycles skip it. record(False) puts the URL back on the frontier instead.
+    def record(handled=True):
+        if handled:
+            if cache:
+                cache.store(full_url, response, body_digest, text_digest, path, links)
+        elif frontier:
+            frontier.retry(full_url)
+    return record
 
-            links = soup.find_all("a", href=True)
-            count = 0
+def _article_path(out_dir, kind, full_url):
+    # Name files after the URL so later cycles update the same file instead of clobbering others
+    url_hash = content_digest(normalize_url(full_url))[:10]
+    if kind == "pdf":
+        stem = os.path.splitext(os.path.basename(urlparse(full_url).path))[0] or "article"
+        return os.path.join(out_dir, f"{stem}_{url_hash}.txt")
+    return os.path.join(out_dir, f"article_{url_hash}.txt")
 
-            for a in links:
-                if len(saved) >= limit:
+@metrics.instrumented("crawl")
+def fetch_open_edu_articles(urls=URLS, limit=50, workers=8, per_host=2, delay=0.5, out_dir="data/raw",
+                            cache=None, frontier=None, extractor=None, max_pdf_bytes=MAX_PDF_BYTES,
+                            html_parser="stream", on_article=None, should_stop=None, allowed_hosts=()):
+    # `limit` is the number of URLs drawn from the frontier this cycle. Without a persistent
+    # Frontier the crawl starts fresh and only follows links found on the seed pages.
+    # With a FetchCache only new or changed articles are returned, so callers skip unchanged work.
+    # PDFs are streamed to disk up to max_pdf_bytes and extracted on the PdfExtractor's processes.
+    # HTML is parsed while it streams in; html_parser="bs4" switches back to full BeautifulSoup trees.
+    # on_article(path, content, record) hands each saved article on in memory; the caller calls
+    # record(True) after it has handled the article, or record(False) to have it fetched again.
+    # should_stop() ends the crawl after the batch in flight. Links are only followed on the seed sites and `allowed_hosts`,
+    # subdomains included, so the crawl never wanders off the trusted list.
+    saved = []
+    unchanged = 0
+    fetched = 0
+    os.makedirs(out_dir, exist_ok=True)
+
+    sites = {_site(urlparse(url).hostname) for url in urls} | {_site(host) for host in allowed_hosts}
+    own_frontier = frontier is None
+    if own_frontier:
+        frontier = Frontier(":memory:", max_depth=1, bloom_bits=1 << 20)
+    frontier.add_seeds(urls)
+    frontier.requeue()
+    own_extractor = extractor is None
+    if own_extractor:
+        extractor = PdfExtractor()
+
+    try:
+        with HostPool(per_host=per_host, delay=delay) as pool, ThreadPoolExecutor(max_workers=workers) as executor:
+            while fetched < limit and not (should_stop and should_stop()):
+                batch = frontier.next_batch(min(workers, limit - fetched))
+                if not batch:
                     break
+                fetched += len(batch)
+                futures = [executor.submit(_fetch_page, pool, cache, frontier, extractor, max_pdf_bytes, html_parser,
+                                           url, depth)
+                           for url, depth in batch]
+
+                for (full_url, depth), future in zip(batch, futures):
+                    kind, content, links, response, body_digest = future.result()
+                    try:
+                        metrics.inc("documents_total", kind=kind or "failed")
+                        if kind == "blocked":
+                            print(f"🚫 Disallowed by robots.txt: {full_url}")
+                            frontier.block(full_url)
+                            continue
+                        # A PDF that could not be extracted is never cached as seen; like a failed fetch it is
+                        # retried after the frontier's failure backoff (an hour at first), not a full revisit interval
+                        failed = (response is None or response.status_code not in (200, 304)
+                                  or (kind == "pdf" and content is None))
+                        frontier.complete(full_url, changed=kind != "unchanged", failed=failed)
+
+                        for link in links:
+                            if not _on_site(link, sites):
+                                continue
+                            if _is_document(link) or (_is_navigation(link) and depth + 1 < frontier.max_depth):
+                                frontier.add(link, depth + 1)
+
+                        if kind == "unchanged":
+                            unchanged += 1
+                            entry = cache.get(full_url)
+                            if response.status_code == 200:
+                                cache.store(full_url, response, entry["body_digest"], entry["text_digest"],
+                                            entry["path"], entry["links"])
+                            else:
+                                cache.touch(full_url)
+                            continue
+                        if failed:
+                            continue
+
+                        if not content:
+                            if cache:
+                                cache.store(full_url, response, body_digest, links=links)
+                            continue
+
+                        text_digest = content_digest(content)
+                        if cache:
+                            entry = cache.get(full_url)
+                            if entry and entry["text_digest"] == text_digest:
+                                unchanged += 1
+                                cache.store(full_url, response, body_digest, text_digest, entry["path"], links)
+                                continue
+                            if cache.has_text(text_digest, full_url):
+                                print(f"♻️ Duplicate content at {full_url}")
+                                cache.store(full_url, response, body_digest, text_digest, links=links)
+                                continue
+
+                        path = _article_path(out_dir, kind, full_url)
+                        with open(path, "w", encoding="utf-8") as f:
+                            f.write(content)
+                        saved.append(path)
+                        print(f"✅ Saved {kind.upper()} content to {path}")
+                        record = _recorder(cache, None if own_frontier else frontier, full_url, response,
+                                           body_digest, text_digest, path, links)
+                        if on_article:
+                            on_article(path, content, record)
+                        else:
+                            record(True)
+                    except Exception as e:
+                        # One bad result (say a malformed link) must not end the crawl or strand the batch
+                        print(f"❌ Error handling {full_url}: {e}")
+                        frontier.complete(full_url, failed=True)
+
+                frontier.commit()
+    finally:
+        if own_frontier:
+            frontier.close()
+        if own_extractor:
+            extractor.close()
 
-                href = a["href"]
-                full_url = urljoin(base_url, href)
-
-                if not any(full_url.lower().endswith(ext) for ext in ALLOWED_EXTENSIONS):
-                    continue
-
-                try:
-                    if full_url.lower().endswith('.pdf'):
-                        print(f"📥 Downloading PDF: {full_url}")
-                        pdf_response = requests.get(full_url, timeout=20)
-                        if pdf_response.status_code == 200:
-                            content = extract_pdf_text(pdf_response.content)
-                            if content:
-                                file_name = os.path.basename(urlparse(full_url).path) or f"article_{len(saved)+1}.txt"
-                                path = os.path.join("data/raw", file_name.replace('.pdf', '.txt'))
-                                with open(path, "w", encoding="utf-8") as f:
-                                    f.write(content)
-                                saved.append(path)
-                                print(f"✅ Saved PDF content to {path}")
-                    else:
-                        page_response = requests.get(full_url, timeout=10)
-                        if page_response.status_code == 200:
-                            inner_soup = BeautifulSoup(page_response.text, "html.parser")
-                            for element in inner_soup.find_all(['script', 'style', 'nav', 'header', 'footer']):
-                                element.decompose()
-                            content = inner_soup.get_text(separator=" ", strip=True)
-                            if len(content) > 500:
-                                path = os.path.join("data/raw", f"article_{len(saved)+1}.txt")
-                                with open(path, "w", encoding="utf-8") as f:
-                                    f.write(content)
-                                saved.append(path)
-                                print(f"✅ Saved HTML content to {path}")
-
-                except Exception as e:
-                    print(f"❌ Error processing {full_url}: {str(e)}")
-                    continue
-
-        except Exception as e:
-            print(f"❌ Error fetching {base_url}: {str(e)}")
-            continue
-
-    print(f"\n📚 Total articles saved: {len(saved)}")
+    print(f"\n📚 Total articles saved: {len(saved)} ({unchanged} unchanged, {fetched} fetched)")
     for path in saved:
         print(f"- {path}")
 
     return saved
 
 if __name__ == "__main__":
-    articles = fetch_open_edu_articles(limit=3)
+    articles = fetch_open_edu_articles()
@@ -0,0 +1,296 @@
+import multiprocessing
+import os
+import queue
+import signal
+import threading
+import time
+from collections import Counter, deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+import metrics
+from cleaner import clean_document
+from document import Document
+from evaluator import MIN_QUALITY, evaluate_summary
+from scraper import fetch_open_edu_articles
+from summarizer import inverse_document_frequency, summarize_batch
+from trainer import save_training_pair
+
+QUEUE_SIZE = 64
+BATCH_SIZE = 16
+MIN_SLEEP = 30
+MAX_SLEEP = 3600
+_DONE = object()
+
+
+def _worker_metrics(collect_metrics):
+    # With collect_metrics a worker's own timings go back as a snapshot for the parent to merge
+    if collect_metrics:
+        metrics.enable()
+        metrics.REGISTRY.reset()
+
+
+def clean_batch(articles, collect_metrics=False):
+    # Runs in a worker process: clean each article into a Document and tokenize it once. The
+    # Documents travel back with their sentences and term counts, from which the parent counts
+    # document frequencies over the whole cycle, and on to process_batch without being re-split.
+    _worker_metrics(collect_metrics)
+    docs = []
+    for path, text in articles:
+        doc = clean_document(text, source=path)
+        doc.term_counts  # splits and tokenizes; cached on the Document and pickled with it
+        docs.append(doc)
+    return docs, metrics.REGISTRY.snapshot() if collect_metrics else None
+
+
+def process_batch(docs, idf=None, collect_metrics=False):
+    # Runs in a worker process: summarize cleaned Documents with the cycle's IDF, then score
+    _worker_metrics(collect_metrics)
+    summaries = summarize_batch(docs, idf=idf)
+    results = [(doc.source, doc.text, summary, evaluate_summary(Document(summary), doc))
+               for doc, summary in zip(docs, summaries)]
+    return results, metrics.REGISTRY.snapshot() if collect_metrics else None
+
+
+def plan_next_cycle(frontier, backlog=0, now=None):
+    # Seconds until the next cycle: soon while URLs are due or work is left over,
+    # otherwise wake up when the stalest page's recrawl interval runs out
+    if backlog or frontier.pending():
+        return MIN_SLEEP
+    next_due = frontier.next_due()
+    if next_due is None:
+        return MAX_SLEEP
+    now = time.time() if now is None else now
+    return min(MAX_SLEEP, max(MIN_SLEEP, next_due - now))
+
+
+class StagedPipeline:
+    # fetch (crawler threads) -> clean (process pool) while the crawl runs, joined by bounded queues
+    # so a slow stage holds back the ones before it; then summarize/evaluate (process pool) with IDF
+    # over the whole cycle -> save (this thread)
+
+    def __init__(self, urls, cache, frontier, extractor, writer, limit=100, workers=2,
+                 batch_size=BATCH_SIZE, queue_size=QUEUE_SIZE, summary_dir="data/summaries", crawl_options=None,
+                 metrics_dir=metrics.METRICS_DIR):
+        self.urls = urls
+        self.cache = cache
+        self.frontier = frontier
+        self.extractor = extractor
+        self.writer = writer
+        self.limit = limit
+        self.workers = workers
+        self.batch_size = batch_size
+        self.queue_size = queue_size
+        self.summary_dir = summary_dir
+        self.crawl_options = crawl_options or {}
+        self.metrics_dir = metrics_dir
+        self.cycle = 0
+        self.stop = threading.Event()
+        self._pool = None
+        self._lock = threading.Lock()
+
+    def _executor(self):
+        with self._lock:
+            if self._pool is None:
+                self._pool = ProcessPoolExecutor(max_workers=self.workers,
+                                                 mp_context=multiprocessing.get_context("spawn"))
+            return self._pool
+
+    def _restart(self, pool):
+        # A worker that died (e.g. OOM-killed) breaks its pool for good; drop it so the next batch
+        # starts a fresh one. Only the pool the caller used is replaced, as in PdfExtractor.
+        with self._lock:
+            if self._pool is not pool:
+                return
+            self._pool = None
+        for process in list((pool._processes or {}).values()):
+            process.terminate()
+        pool.shutdown(wait=False, cancel_futures=True)
+
+    def _submit(self, fn, *args):
+        # Returns (pool, future); a pool found broken is replaced and the batch tried once on the new one
+        for attempt in range(2):
+            pool = self._executor()
+            try:
+                return pool, pool.submit(fn, *args)
+            except BrokenProcessPool as e:
+                self._restart(pool)
+                error = e
+        future = Future()
+        future.set_exception(error)
+        return pool, future
+
+    def _crawl(self, fetched):
+        try:
+            fetch_open_edu_articles(self.urls, limit=self.limit, cache=self.cache, frontier=self.frontier,
+                                    extractor=self.extractor, on_article=lambda *article: fetched.put(article),
+                                    should_stop=self.stop.is_set, **self.crawl_options)
+        except Exception as e:
+            print(f"❌ Crawl stage failed: {e}")
+        finally:
+            fetched.put(_DONE)
+
+    def _batch(self, fetched, cleaned):
+        # Groups articles into micro-batches for cleaning; the bounded `cleaned` queue caps batches in flight.
+        # _DONE always follows, or the main thread would wait on `cleaned` forever.
+        try:
+            done = False
+            while not done:
+                metrics.observe("queue_depth", fetched.qsize(), metrics.DEPTH_BUCKETS, queue="fetched")
+                item = fetched.get()
+                if item is _DONE:
+                    break
+                batch = [item]
+                while len(batch) < self.batch_size:
+                    try:
+                        item = fetched.get(timeout=0.05)
+                    except queue.Empty:
+                        break
+                    if item is _DONE:
+                        done = True
+                        break
+                    batch.append(item)
+                articles = [(path, text) for path, text, _ in batch]
+                cleaned.put((batch, *self._submit(clean_batch, articles, metrics.enabled())))
+        except Exception as e:
+            print(f"❌ Batch stage failed: {e}")
+        finally:
+            cleaned.put(_DONE)
+
+    def _results(self, batch, pool, future, stats):
+        # A batch's worker results, or None after recording the whole batch as failed
+        try:
+            results, snapshot = future.result()
+        except Exception as e:
+            if isinstance(e, BrokenProcessPool):
+                self._restart(pool)
+            print(f"❌ Processing failed for {len(batch)} articles: {e}")
+            stats["failed"] += len(batch)
+            for *_, record in batch:
+                record(False)
+            return None
+        if snapshot:
+            metrics.REGISTRY.merge(snapshot)
+        return results
+
+    def _collect(self, batch, pool, future, stats):
+        results = self._results(batch, pool, future, stats)
+        for (*_, record), result in zip(batch, results or ()):
+            try:
+                self._save(*result, stats)
+            except Exception as e:
+                print(f"❌ Saving failed for {result[0]}: {e}")
+                stats["failed"] += 1
+                record(False)
+                continue
+            # Only now may the fetch cache treat the article as done
+            record(True)
+
+    def _summarize(self, documents, document_frequency, stats):
+        # IDF comes from every article of the cycle, not just the micro-batch; each batch is sent
+        # only the weights of its own terms. The deque caps batches in flight like the queues do.
+        idf = inverse_document_frequency(document_frequency, len(documents))
+        in_flight = deque()
+        for start in range(0, len(documents), self.batch_size):
+            batch = documents[start:start + self.batch_size]
+            docs = [doc for doc, _ in batch]
+            weights = {t: idf[t] for doc in docs for t in doc.term_counts}
+            in_flight.append((batch, *self._submit(process_batch, docs, weights, metrics.enabled())))
+            if len(in_flight) >= max(1, self.workers * 2):
+                self._collect(*in_flight.popleft(), stats)
+        while in_flight:
+            self._collect(*in_flight.popleft(), stats)
+
+    def _save(self, path, cleaned, summary, score, stats):
+        name = os.path.splitext(os.path.basename(path))[0]
+        print(f"📝 Summary Preview (score={score}): {summary[:300]}...")
+        if score < MIN_QUALITY:
+            print(f"🗑️ Skipping {path}: summary quality {score} below {MIN_QUALITY}.")
+            stats["skipped"] += 1
+            return
+        with open(os.path.join(self.summary_dir, f"summary_{name}.txt"), "w", encoding="utf-8") as f:
+            f.write(summary)
+        if save_training_pair(cleaned, summary, f"pair_{name}.json", writer=self.writer):
+            print(f"✅ Processed {path}. Summary and fine-tune pair saved.")
+            stats["saved"] += 1
+        else:
+            print(f"♻️ Processed {path}. Identical fine-tune pair already stored.")
+            stats["duplicates"] += 1
+
+    def run_cycle(self):
+        self.cycle += 1
+        started = time.perf_counter()
+        before = metrics.REGISTRY.snapshot() if metrics.enabled() else None
+        os.makedirs(self.summary_dir, exist_ok=True)
+        fetched = queue.Queue(self.queue_size)
+        cleaned = queue.Queue(max(1, self.workers * 2))
+        stats = {"articles": 0, "saved": 0, "skipped": 0, "duplicates": 0, "failed": 0}
+
+        threads = [threading.Thread(target=self._crawl, args=(fetched,), name="crawl", daemon=True),
+                   threading.Thread(target=self._batch, args=(fetched, cleaned), name="batch", daemon=True)]
+        for thread in threads:
+            thread.start()
+
+        # Clean while the crawl runs, draining everything it produced even after a stop request,
+        # and count each term's document frequency across the whole cycle
+        documents = []
+        document_frequency = Counter()
+        while True:
+            metrics.observe("queue_depth", cleaned.qsize(), metrics.DEPTH_BUCKETS, queue="cleaned")
+            item = cleaned.get()
+            if item is _DONE:
+                break
+            batch, pool, future = item
+            stats["articles"] += len(batch)
+            for (*_, record), doc in zip(batch, self._results(batch, pool, future, stats) or ()):
+                document_frequency.update(doc.term_counts.keys())
+                documents.append((doc, record))
+
+        for thread in threads:
+            thread.join()
+        self._summarize(documents, document_frequency, stats)
+        self.writer.flush()
+        self.frontier.commit()
+        if before is not None:
+            self._report(before, time.perf_counter() - started, stats)
+        return stats
+
+    def _report(self, before, elapsed, stats):
+        # One JSON line per cycle plus a refreshed Prometheus file
+        for outcome in ("saved", "skipped", "duplicates", "failed"):
+            metrics.inc("articles_total", stats[outcome], outcome=outcome)
+        summary = metrics.cycle_summary(before, elapsed, cycle=self.cycle, **stats)
+        metrics.set_gauge("cycle_seconds", summary["seconds"])
+        metrics.set_gauge("docs_per_second", summary["docs_per_second"])
+        metrics.log_event("cycle", self.metrics_dir, **summary)
+        metrics.write_prometheus(self.metrics_dir)
+        print(f"📊 Cycle #{self.cycle}: {summary['docs_per_second']} docs/s, "
+              f"{summary['bytes_downloaded']} bytes downloaded in {summary['seconds']}s")
+
+    def run(self):
+        while not self.stop.is_set():
+            cycle = self.cycle + 1
+            print(f"\n🔁 Starting Self-Learning Cycle #{cycle}...")
+            print(f"🔍 Scanning trusted open education sites ({self.frontier.pending()} URLs due)...")
+            stats = self.run_cycle()
+            if not stats["articles"]:
+                print("⚠️ No new or changed articles found in this cycle.")
+            if self.stop.is_set():
+                break
+            delay = plan_next_cycle(self.frontier)
+            print(f"✅ Cycle #{cycle} completed ({stats['saved']} pairs saved). "
+                  f"Sleeping for {delay / 60:.1f} minutes before next cycle...\n")
+            self.stop.wait(delay)
+        print("🛑 Pipeline stopped; in-flight articles were saved.")
+
+    def install_signal_handlers(self):
+        def handle(signum, frame):
+            print(f"\n🛑 Received signal {signum}, finishing in-flight articles...")
+            self.stop.set()
+        signal.signal(signal.SIGTERM, handle)
+        signal.signal(signal.SIGINT, handle)
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
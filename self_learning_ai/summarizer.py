@@ -1,3 +1,76 @@
-def summarize_text(text):
-    sentences = text.split('. ')
-    return '. '.join(sentences[:3]) + '.'
+import math
+from collections import Counter
+
+import metrics
+from document import as_document
+
+# (minimum, maximum, share of sentences), matching the frontend's summary levels
+LEVELS = {
+    "student": (3, 8, 0.15),
+    "professor": (4, 12, 0.2),
+}
+REDUNDANCY_LIMIT = 0.7
+
+
+def summary_length(sentence_count, level="student"):
+    minimum, maximum, share = LEVELS[level]
+    return min(sentence_count, maximum, max(minimum, int(sentence_count * share)))
+
+
+def _position_weight(index, count):
+    # Openings and closings carry the most signal in course material, like the frontend's scoring
+    if index < count * 0.15:
+        return 1.3
+    if index > count * 0.85:
+        return 1.15
+    return 1.0
+
+
+def _rank(doc, idf, length):
+    sentences = doc.sentences
+    weights = {t: tf * idf.get(t, 1.0) for t, tf in doc.term_counts.items()}
+
+    # Similarity to the document's TF-IDF centroid stands in for TextRank centrality in linear time
+    scored = []
+    for index, words in enumerate(doc.sentence_terms):
+        if not words:
+            continue
+        unique = set(words)
+        score = sum(weights[t] for t in unique) / math.sqrt(len(words))
+        if len(words) < 4 or len(words) > 60:
+            score *= 0.5
+        scored.append((score * _position_weight(index, len(sentences)), index, unique))
+    scored.sort(key=lambda item: (-item[0], item[1]))
+
+    chosen = []
+    for _, index, unique in scored:
+        if any(len(unique & other) / len(unique | other) > REDUNDANCY_LIMIT for _, other in chosen):
+            continue
+        chosen.append((index, unique))
+        if len(chosen) >= length:
+            break
+    return " ".join(sentences[index] for index, _ in sorted(chosen, key=lambda item: item[0]))
+
+
+def inverse_document_frequency(document_frequency, total):
+    return {t: math.log((1 + total) / (1 + df)) + 1 for t, df in document_frequency.items()}
+
+
+@metrics.instrumented("summarize")
+def summarize_batch(docs, level="student", idf=None):
+    # Accepts strings or Documents; IDF statistics are shared across the batch unless `idf` brings
+    # them from a larger collection. Every document's sentences and terms come from its Document
+    # cache, so nothing is re-tokenized.
+    docs = [as_document(doc) for doc in docs]
+
+    if idf is None:
+        document_frequency = Counter()
+        for doc in docs:
+            document_frequency.update(doc.term_counts.keys())
+        idf = inverse_document_frequency(document_frequency, len(docs))
+
+    return [_rank(doc, idf, summary_length(len(doc.sentences), level)) for doc in docs]
+
+
+def summarize_text(text, level="student"):
+    return summarize_batch([text], level)[0]
@@ -0,0 +1,92 @@
+import copy
+import json
+import os
+
+import metrics
+from benchmark import STAGES, build_corpus, compare, main, percentile, run_benchmark
+
+RESULT = {
+    "corpus": {"pages": 8, "pdfs": 2, "sections": 2, "seed": 0},
+    "docs_per_second": 20.0,
+    "peak_rss_mb": 60.0,
+    "stages": {"fetch": {"count": 10, "p50": 0.02, "p95": 0.05},
+               "clean": {"count": 10, "p50": 0.0001, "p95": 0.0008}},
+}
+
+
+def test_corpus_varies_page_size_and_fanout():
+    routes = build_corpus(pages=20, pdfs=3, sections=2)
+    pages = [body for path, body in routes.items() if path.endswith(".html")]
+    assert len(pages) == 20
+    assert sum(path.endswith(".pdf") for path in routes) == 3
+    assert len({len(body) // 1000 for body in pages}) > 3
+    assert len({body.count("related") for body in pages}) > 3
+    assert routes == build_corpus(pages=20, pdfs=3, sections=2)
+
+
+def test_percentile_is_nearest_rank():
+    values = list(range(1, 101))
+    assert percentile(values, 0.5) == 50
+    assert percentile(values, 0.95) == 95
+    assert percentile([7], 0.95) == 7
+
+
+def test_benchmark_runs_whole_path_offline():
+    result = run_benchmark(pages=8, pdfs=2, sections=2, repeat=1)
+
+    assert result["documents"] == result["saved"] == 10
+    assert result["docs_per_second"] > 0
+    assert result["bytes_downloaded"] > 0
+    assert result["peak_rss_mb"] > 0
+    assert list(result["stages"]) == STAGES
+    assert result["stages"]["extract_pdf"]["count"] == 2
+    assert all(s["p50"] <= s["p95"] for s in result["stages"].values())
+    # The benchmark leaves the global registry as it found it
+    assert not metrics.enabled()
+    assert not metrics.REGISTRY.keep_samples
+
+
+def test_compare_passes_within_thresholds():
+    result = copy.deepcopy(RESULT)
+    result["docs_per_second"] = 16.0
+    result["stages"]["fetch"]["p95"] = 0.09
+    assert compare(result, RESULT) == []
+
+
+def test_compare_flags_each_regression():
+    result = copy.deepcopy(RESULT)
+    result["docs_per_second"] = 10.0
+    result["peak_rss_mb"] = 90.0
+    result["stages"]["fetch"]["p95"] = 0.2
+    regressions = compare(result, RESULT)
+    assert len(regressions) == 3
+    assert regressions[0].startswith("throughput")
+    assert regressions[1].startswith("peak RSS")
+    assert regressions[2].startswith("fetch p95")
+
+
+def test_compare_ignores_sub_millisecond_noise():
+    result = copy.deepcopy(RESULT)
+    result["stages"]["clean"]["p95"] = 0.0019
+    assert compare(result, RESULT) == []
+
+
+def test_thresholds_are_configurable():
+    result = copy.deepcopy(RESULT)
+    result["docs_per_second"] = 18.0
+    assert compare(result, RESULT) == []
+    assert len(compare(result, RESULT, {"docs_per_second": 0.05, "latency": 1.0, "peak_rss_mb": 0.25})) == 1
+
+
+def test_cli_writes_baseline_then_fails_on_regression(tmp_path):
+    baseline = str(tmp_path / "baseline.json")
+    args = ["--pages", "6", "--pdfs", "1", "--sections", "2", "--repeat", "1", "--baseline", baseline]
+    assert main(args) == 0
+    assert os.path.exists(baseline)
+
+    with open(baseline, encoding="utf-8") as f:
+        stored = json.load(f)
+    stored["docs_per_second"] *= 100
+    with open(baseline, "w", encoding="utf-8") as f:
+        json.dump(stored, f)
+    assert main(args + ["--max-throughput-drop", "0.5"]) == 1
@@ -0,0 +1,89 @@
+import re
+import time
+import tracemalloc
+
+from cleaner import clean_stream, clean_text
+
+PARAGRAPH = ("Open courseware lets students study algorithms [12] at their own pace, "
+             "with notes at https://ocw.example/notes and worked examples for every unit.\n"
+             "Each   chapter ends with\texercises that revisit the main ideas.")
+
+
+def legacy_clean_text(text):
+    # The previous multi-pass implementation, kept here as the benchmark baseline
+    text = re.sub(r'\s+', ' ', text)
+    text = re.sub(r'\[[0-9]+\]', '', text)
+    text = re.sub(r'http\S+', '', text)
+    text = re.sub(r'[^\x00-\x7F]+', ' ', text)
+    text = re.sub(r'Read Full Story.*$', '', text, flags=re.MULTILINE)
+    text = re.sub(r'Originally published.*$', '', text, flags=re.MULTILINE)
+    text = re.sub(r'This article was.*$', '', text, flags=re.MULTILINE)
+    text = re.sub(r'Learn more about.*$', '', text, flags=re.MULTILINE)
+    text = re.sub(r'Previous|Next|keyboard_arrow.*', '', text)
+    text = re.sub(r'Topics: .*?\n', '\n', text)
+    text = re.sub(r'\n\s*\n', '\n\n', text)
+    text = text.strip()
+    paragraphs = text.split('\n\n')
+    return '\n\n'.join(p for p in paragraphs if len(p.strip()) > 100)
+
+
+def make_document(paragraphs):
+    blocks = []
+    for i in range(paragraphs):
+        blocks.append(f"Topics: unit {i}\n{PARAGRAPH}\nRead Full Story about unit {i}")
+        blocks.append("Previous Next keyboard_arrow_right")
+    return "\n\n".join(blocks)
+
+
+def test_removes_boilerplate_and_keeps_paragraphs():
+    cleaned = clean_text(make_document(2))
+    paragraphs = cleaned.split("\n\n")
+    assert len(paragraphs) == 2
+    assert paragraphs[0] == (
+        "Open courseware lets students study algorithms at their own pace, with notes at "
+        "and worked examples for every unit. Each chapter ends with exercises that revisit the main ideas.")
+
+
+def test_short_paragraphs_are_dropped():
+    text = "Short line.\n\n" + "A long paragraph " * 10 + "\n \n  Another short one."
+    assert clean_text(text) == ("A long paragraph " * 10).strip()
+    # The old first pass flattened every newline, so nothing was ever filtered
+    assert "Short line." in legacy_clean_text(text)
+
+
+def test_stream_matches_clean_text():
+    text = make_document(200)
+    for size in (13, 4096):
+        chunks = (text[i:i + size] for i in range(0, len(text), size))
+        assert "\n\n".join(clean_stream(chunks, max_buffer=1024)) == clean_text(text)
+
+
+def test_stream_memory_is_bounded():
+    chunk = make_document(40)
+
+    tracemalloc.start()
+    paragraphs = 0
+    for _ in clean_stream((chunk for _ in range(200)), max_buffer=64 * 1024):
+        paragraphs += 1
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    assert paragraphs == 40 * 200
+    assert peak < 4 * len(chunk) + 256 * 1024
+
+
+def test_benchmark_cleaning_throughput():
+    text = make_document(8000)
+    size_mb = len(text) / 1e6
+
+    started = time.perf_counter()
+    legacy_clean_text(text)
+    legacy_time = time.perf_counter() - started
+
+    started = time.perf_counter()
+    clean_text(text)
+    fused_time = time.perf_counter() - started
+
+    print(f"\n{size_mb:.1f} MB: legacy {size_mb / legacy_time:.1f} MB/s, fused {size_mb / fused_time:.1f} MB/s")
+    assert fused_time < legacy_time
+    assert size_mb / fused_time > 5
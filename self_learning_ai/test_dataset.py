@@ -0,0 +1,161 @@
+import glob
+import json
+import os
+import shutil
+
+import pytest
+
+from dataset import DatasetReader, DatasetWriter, migrate, read_index
+from trainer import save_training_pair
+
+
+def pair(i):
+    return {"id": f"pair_{i}", "input": f"Article {i} about open course material. " * 5, "output": f"Summary {i}."}
+
+
+def test_append_stream_and_random_access(tmp_path):
+    with DatasetWriter(str(tmp_path)) as writer:
+        for i in range(10):
+            assert writer.append(pair(i))
+        assert not writer.append(dict(pair(3), id="renamed"))
+
+    with DatasetReader(str(tmp_path)) as reader:
+        assert len(reader) == 10
+        assert reader[0] == pair(0)
+        assert reader[-1] == pair(9)
+        assert [r["id"] for r in reader] == [f"pair_{i}" for i in range(10)]
+        with pytest.raises(IndexError):
+            reader[10]
+
+
+def test_shards_rotate_and_compress(tmp_path):
+    with DatasetWriter(str(tmp_path), max_shard_bytes=1024, compression="gzip") as writer:
+        for i in range(30):
+            writer.append(pair(i))
+
+    assert len(glob.glob(str(tmp_path / "shard-*.jsonl.gz"))) >= 2
+    assert not glob.glob(str(tmp_path / "*.tmp"))
+    with DatasetReader(str(tmp_path)) as reader:
+        assert len(reader) == 30
+        assert reader[17] == pair(17)
+        assert list(reader)[29] == pair(29)
+
+
+def test_writer_reopens_and_keeps_deduping(tmp_path):
+    with DatasetWriter(str(tmp_path)) as writer:
+        writer.append(pair(0))
+    with DatasetWriter(str(tmp_path)) as writer:
+        assert not writer.append(pair(0))
+        assert writer.append(pair(1))
+
+    with DatasetReader(str(tmp_path)) as reader:
+        assert len(reader) == 2
+
+
+def test_recovers_after_crash(tmp_path):
+    writer = DatasetWriter(str(tmp_path), flush_every=1000)
+    writer.append(pair(0))
+    writer.flush()
+    writer.append(pair(1))
+    writer._file.write(b'{"id": "torn", "inp')
+    writer._file.flush()
+    writer._index.write(b"180 4")
+    writer._index.flush()
+    # The process dies here: pair 1 never reached the index and both files end in a torn line
+
+    with DatasetReader(str(tmp_path)) as reader:
+        assert len(reader) == 1
+
+    with DatasetWriter(str(tmp_path)) as recovered:
+        assert recovered.append(pair(2))
+    with DatasetReader(str(tmp_path)) as reader:
+        assert [r["id"] for r in reader] == ["pair_0", "pair_1", "pair_2"]
+
+
+def test_flush_appends_to_the_shard_index_not_the_manifest(tmp_path):
+    manifest = tmp_path / "manifest.json"
+    with DatasetWriter(str(tmp_path), max_shard_bytes=4096, flush_every=1) as writer:
+        writer.append(pair(0))
+        started = manifest.read_bytes()
+        for i in range(1, 8):
+            writer.append(pair(i))
+            assert manifest.read_bytes() == started
+        assert (tmp_path / "shard-00000.idx").read_text().count("\n") == 8
+
+        # Sealing records the shard's count; the manifest still has one entry per shard
+        while not json.loads(manifest.read_text())["shards"][0]["sealed"]:
+            i += 1
+            writer.append(pair(i))
+    shards = json.loads(manifest.read_text())["shards"]
+    assert shards[0]["records"] == i + 1
+    assert all(set(shard) <= {"name", "index", "sealed", "compression", "records"} for shard in shards)
+
+    with DatasetReader(str(tmp_path)) as reader:
+        assert len(reader) == i + 1
+        assert reader[i] == pair(i)
+
+
+def test_version_1_manifest_is_upgraded(tmp_path):
+    with DatasetWriter(str(tmp_path), max_shard_bytes=1024) as writer:
+        for i in range(10):
+            writer.append(pair(i))
+    # Rebuild the old layout: every record inline in the manifest, no index files
+    manifest = json.loads((tmp_path / "manifest.json").read_text())
+    for shard in manifest["shards"]:
+        shard["records"] = read_index(str(tmp_path / shard.pop("index")))[0]
+    manifest["version"] = 1
+    (tmp_path / "manifest.json").write_text(json.dumps(manifest))
+    for path in glob.glob(str(tmp_path / "*.idx")):
+        os.remove(path)
+
+    with DatasetReader(str(tmp_path)) as reader:
+        assert list(reader) == [pair(i) for i in range(10)]
+    with DatasetWriter(str(tmp_path), max_shard_bytes=1024) as writer:
+        assert not writer.append(pair(3))
+        assert writer.append(pair(10))
+    assert json.loads((tmp_path / "manifest.json").read_text())["version"] == 2
+    with DatasetReader(str(tmp_path)) as reader:
+        assert list(reader) == [pair(i) for i in range(11)]
+
+
+def test_reader_dedupes_by_hash(tmp_path):
+    for sub in ("a", "b"):
+        with DatasetWriter(str(tmp_path / sub)) as writer:
+            writer.append(pair(0))
+            writer.append(pair(1))
+    # Shards copied together from two writers repeat the same records
+    manifest_a = json.loads((tmp_path / "a" / "manifest.json").read_text())
+    manifest_b = json.loads((tmp_path / "b" / "manifest.json").read_text())
+    os.rename(tmp_path / "b" / "shard-00000.jsonl", tmp_path / "a" / "shard-00001.jsonl")
+    os.rename(tmp_path / "b" / "shard-00000.idx", tmp_path / "a" / "shard-00001.idx")
+    manifest_b["shards"][0].update(name="shard-00001.jsonl", index="shard-00001.idx")
+    manifest_a["shards"][0].update(sealed=True, records=2)
+    manifest_a["shards"] += manifest_b["shards"]
+    (tmp_path / "a" / "manifest.json").write_text(json.dumps(manifest_a))
+
+    with DatasetReader(str(tmp_path / "a")) as reader:
+        assert len(reader) == 4
+        assert len(list(reader.iter(dedupe=True))) == 2
+
+
+def test_migrate_imports_pair_files(tmp_path):
+    for path in glob.glob(os.path.join(os.path.dirname(__file__), "data", "fine_tune", "pair_*.json")):
+        shutil.copy(path, tmp_path)
+    files = glob.glob(str(tmp_path / "pair_*.json"))
+
+    added = migrate(str(tmp_path), delete=True)
+
+    assert 0 < added < len(files)
+    assert not glob.glob(str(tmp_path / "pair_*.json"))
+    with DatasetReader(str(tmp_path)) as reader:
+        assert len(reader) == added
+        assert all(r["input"] and r["id"].startswith("pair_") for r in reader)
+
+
+def test_save_training_pair_appends_to_writer(tmp_path):
+    with DatasetWriter(str(tmp_path)) as writer:
+        assert save_training_pair(" text ", " summary ", "pair_x.json", writer=writer)
+        assert not save_training_pair("text", "summary", "pair_y.json", writer=writer)
+
+    with DatasetReader(str(tmp_path)) as reader:
+        assert reader[0] == {"id": "pair_x", "input": "text", "output": "summary"}
@@ -0,0 +1,47 @@
+import time
+
+from document import Document
+from evaluator import MIN_QUALITY, evaluate_summary, rouge_l, rouge_n, score_summary
+from summarizer import summarize_text
+from test_summarizer import make_article
+
+
+def test_rouge_against_source():
+    source = Document("The cat sat on the mat. The dog chased the cat around the garden.")
+    summary = Document("The cat sat on the mat.")
+
+    rouge1 = rouge_n(summary, source, 1)
+    assert rouge1["precision"] == 1.0
+    assert rouge1["recall"] == 6 / 14
+    assert rouge_n(summary, source, 2)["precision"] == 1.0
+    assert rouge_l(summary, source)["precision"] == 1.0
+    assert rouge_l(Document("Mat the on sat cat the."), source)["precision"] == 0.5
+
+
+def test_extractive_summary_passes_and_junk_fails():
+    article = make_article("recursion")
+    source = Document(article)
+
+    assert evaluate_summary(Document(summarize_text(article)), source) >= MIN_QUALITY
+    assert evaluate_summary("Bananas grow in tropical climates and are eaten every day worldwide.", source) < MIN_QUALITY
+    repeated = "Section 3 covers lecture notes about recursion. " * 6
+    assert score_summary(repeated, source)["redundancy"] > 0.5
+    assert evaluate_summary(repeated, source) < MIN_QUALITY
+
+
+def test_legacy_score_without_source():
+    assert evaluate_summary("Short.") == 1
+    assert evaluate_summary("word " * 20 + "the result.") == 3
+
+
+def test_many_candidates_reuse_source_cache():
+    source = Document(make_article("graphs", 400))
+    candidates = [Document(" ".join(source.sentences[i:i + 5])) for i in range(0, 300, 3)]
+
+    started = time.perf_counter()
+    scores = [score_summary(c, source)["quality"] for c in candidates]
+    elapsed = time.perf_counter() - started
+
+    print(f"\n{len(candidates)} candidates scored in {elapsed * 1000:.0f} ms")
+    assert all(0 < s <= 1 for s in scores)
+    assert elapsed < 2
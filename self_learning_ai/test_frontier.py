@@ -0,0 +1,106 @@
+import os
+import time
+
+import pytest
+
+from frontier import BLOOM_SAVE_EVERY, MIN_INTERVAL, BloomFilter, Frontier
+from urlnorm import normalize_url
+
+
+def test_normalize_url():
+    assert normalize_url("HTTP://Example.COM:80/a/./b/../c?utm_source=x&b=2&a=1#top") == "http://example.com/a/c?a=1&b=2"
+    assert normalize_url("https://example.com") == "https://example.com/"
+    assert normalize_url("https://example.com:8443/dir/") == "https://example.com:8443/dir/"
+
+
+def test_unparseable_urls_are_rejected():
+    for url in ("http://example.com:80x/a.html", "http://example.com:99999/", "http://[oops/x.html", "/relative"):
+        with pytest.raises(ValueError):
+            normalize_url(url)
+    with Frontier(":memory:", robots=False) as frontier:
+        assert not frontier.add("http://example.com:80x/a.html", 1)
+        assert frontier.pending() == 0
+
+
+def test_requeue_returns_urls_an_aborted_crawl_left_in_flight():
+    with Frontier(":memory:", robots=False) as frontier:
+        frontier.add("https://a.example/1", 1)
+        frontier.add("https://a.example/2", 1)
+        frontier.next_batch(2)
+        assert frontier.pending() == 0
+        frontier.requeue()
+        assert frontier.pending() == 2
+
+
+def test_failures_back_off_without_touching_the_revisit_interval(tmp_path):
+    db = str(tmp_path / "crawl.db")
+    with Frontier(db, robots=False) as frontier:
+        frontier.add("https://a.example/", 0)
+        delays = []
+        for _ in range(3):
+            frontier.complete("https://a.example/", failed=True)
+            delays.append(frontier.next_due() - time.time())
+        assert [round(d / MIN_INTERVAL) for d in delays] == [1, 2, 4]
+
+        frontier.complete("https://a.example/", changed=True)
+        assert frontier.next_due() - time.time() == pytest.approx(MIN_INTERVAL * 3, abs=60)
+        frontier.complete("https://a.example/", failed=True)
+        assert frontier.next_due() - time.time() == pytest.approx(MIN_INTERVAL, abs=60)
+
+
+def test_bloom_filter_has_fixed_size():
+    seen = BloomFilter(size_bits=1 << 16)
+    assert seen.add("https://example.com/a")
+    assert not seen.add("https://example.com/a")
+    assert "https://example.com/a" in seen
+    assert "https://example.com/b" not in seen
+    for i in range(5000):
+        seen.add(f"https://example.com/{i}")
+    assert len(seen.bits) == (1 << 16) // 8
+
+
+def test_next_batch_prefers_shallow_urls_and_spreads_hosts():
+    with Frontier(":memory:", robots=False) as frontier:
+        frontier.add("https://a.example/deep", 2)
+        frontier.add("https://a.example/1", 1)
+        frontier.add("https://a.example/2", 1)
+        frontier.add("https://b.example/1", 1)
+        frontier.add("https://a.example/", 0)
+
+        batch = frontier.next_batch(3)
+        assert batch == [("https://a.example/", 0), ("https://b.example/1", 1), ("https://a.example/1", 1)]
+        assert frontier.next_batch(10) == [("https://a.example/2", 1), ("https://a.example/deep", 2)]
+        assert frontier.next_batch(10) == []
+
+
+def test_bloom_bitmap_is_saved_periodically_not_per_commit(tmp_path):
+    db = str(tmp_path / "crawl.db")
+    frontier = Frontier(db, robots=False, bloom_bits=1 << 16)
+    frontier.add_seeds(["https://a.example/"])
+    for _ in range(BLOOM_SAVE_EVERY - 2):
+        frontier.commit()
+    assert not os.path.exists(db + ".bloom")
+    frontier.commit()
+    assert os.path.exists(db + ".bloom")
+
+    # URLs queued after the last save are still known after a crash
+    frontier.add("https://a.example/late", 1)
+    frontier.commit()
+    with Frontier(db, robots=False, bloom_bits=1 << 16) as resumed:
+        assert "https://a.example/late" in resumed.seen
+        assert not resumed.add("https://a.example/late", 1)
+    frontier.close()
+
+
+def test_frontier_resumes_in_flight_urls_after_restart(tmp_path):
+    db = str(tmp_path / "crawl.db")
+    frontier = Frontier(db, robots=False)
+    frontier.add_seeds(["https://a.example/", "https://b.example/"])
+    batch = frontier.next_batch(2)
+    frontier.complete(batch[0][0])
+    frontier.commit()
+    # Simulate a killed process: the second URL never completes
+
+    with Frontier(db, robots=False) as resumed:
+        assert resumed.next_batch(10) == [batch[1]]
+        assert not resumed.add("https://a.example/", 0)
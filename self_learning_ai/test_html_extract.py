@@ -0,0 +1,79 @@
+import time
+
+from html_extract import PageExtractor, extract_html, extract_with_soup
+
+BOILERPLATE = """<header><a href="/">Home</a><nav><a href="/courses">Courses</a> <a href="/about">About</a></nav></header>
+<script>var tracking = "<p>not text</p>";</script><style>p { color: red; }</style>"""
+
+
+def make_page(sections=400):
+    body = []
+    for i in range(sections):
+        body.append(f"""<section><h2>Unit {i} &amp; review</h2>
+<p>Students explore <em>algorithms</em>, data structures and <a href="/unit/{i}.html">unit {i} notes</a>.
+This open textbook chapter explains recursion, complexity&nbsp;analysis and proofs.</p>
+<!-- editor note {i} --><ul><li>Exercise {i}.1</li><li>Exercise {i}.2<br>with hints</li></ul></section>""")
+    return f"""<!DOCTYPE html><html><head><title>Open CS Textbook</title></head><body>{BOILERPLATE}
+<main>{"".join(body)}</main><footer><a href="/license.pdf">License</a> CC BY 4.0</footer></body></html>"""
+
+
+def feed_in_chunks(html, size):
+    extractor = PageExtractor("https://oer.example/book/")
+    for start in range(0, len(html), size):
+        extractor.feed(html[start:start + size])
+    extractor.close()
+    return extractor.links, extractor.text()
+
+
+def test_stream_extractor_matches_beautifulsoup():
+    html = make_page(20)
+    expected = extract_with_soup(html, "https://oer.example/book/")
+    assert extract_html(html, "https://oer.example/book/") == expected
+    # Chunk boundaries land inside tags, entities and text nodes
+    for size in (7, 64, 1000):
+        assert feed_in_chunks(html, size) == expected
+
+
+def test_stream_extractor_skips_boilerplate():
+    links, text = extract_html(make_page(1), "https://oer.example/book/")
+    assert "https://oer.example/courses" in links
+    assert "https://oer.example/license.pdf" in links
+    assert "Courses" not in text
+    assert "tracking" not in text
+    assert "CC BY" not in text
+    assert "Unit 0 & review" in text
+
+
+def test_links_only_mode_collects_no_text():
+    links, text = extract_html(make_page(3), "https://oer.example/", want_text=False)
+    assert text is None
+    assert len(links) == 3 + 4
+
+
+def test_malformed_links_are_skipped_not_fatal():
+    html = make_page(2).replace("<main>", "<main><a href='http://[oops/x.html'>broken</a>")
+    for parser in ("stream", "bs4"):
+        links, text = extract_html(html, "https://oer.example/book/", parser=parser)
+        assert "https://oer.example/unit/1.html" in links
+        assert not any("oops" in link for link in links)
+        assert "Unit 1 & review" in text
+
+
+def test_benchmark_stream_extractor_against_beautifulsoup():
+    html = make_page()
+    base = "https://oer.example/book/"
+
+    started = time.perf_counter()
+    for _ in range(3):
+        soup_result = extract_with_soup(html, base)
+    soup_time = (time.perf_counter() - started) / 3
+
+    started = time.perf_counter()
+    for _ in range(3):
+        stream_result = feed_in_chunks(html, 64 * 1024)
+    stream_time = (time.perf_counter() - started) / 3
+
+    print(f"\n{len(html) / 1024:.0f} KiB page: BeautifulSoup {soup_time * 1000:.1f} ms, "
+          f"streaming extractor {stream_time * 1000:.1f} ms")
+    assert stream_result == soup_result
+    assert stream_time < soup_time / 2
@@ -0,0 +1,110 @@
+import io
+import os
+import time
+import tracemalloc
+
+import PyPDF2
+
+from benchmark import make_pdf
+from pdf_extractor import PdfExtractor, extract_pdf_file, iter_pdf_pages, spool_response
+
+PAGE_COUNT = 300
+
+
+def legacy_extract_pdf_text(pdf_content):
+    # The previous in-memory implementation, kept here as the benchmark baseline
+    pdf_reader = PyPDF2.PdfReader(io.BytesIO(pdf_content))
+    text = ""
+    for page in pdf_reader.pages:
+        if page.extract_text():
+            text += page.extract_text() + "\n"
+    return text
+
+
+class FakeResponse:
+    def __init__(self, data, declared=True):
+        self.data = data
+        self.headers = {"Content-Length": str(len(data))} if declared else {}
+
+    def iter_content(self, chunk_size):
+        for start in range(0, len(self.data), chunk_size):
+            yield self.data[start:start + chunk_size]
+
+
+def test_pages_are_yielded_in_order():
+    pages = list(iter_pdf_pages(io.BytesIO(make_pdf(3, lines_per_page=2))))
+    assert len(pages) == 3
+    assert "Page 2 line 1" in pages[2]
+    assert extract_pdf_file(io.BytesIO(make_pdf(3, lines_per_page=2))) == "\n".join(pages) + "\n"
+
+
+def test_spool_response_enforces_byte_cap():
+    data = make_pdf(5)
+    path, digest = spool_response(FakeResponse(data), max_bytes=len(data))
+    try:
+        with open(path, "rb") as f:
+            assert f.read() == data
+        assert digest
+    finally:
+        os.remove(path)
+
+    assert spool_response(FakeResponse(data), max_bytes=len(data) - 1) == (None, None)
+    assert spool_response(FakeResponse(data, declared=False), max_bytes=len(data) - 1) == (None, None)
+
+
+def test_extraction_timeout_restarts_pool(tmp_path):
+    path = tmp_path / "big.pdf"
+    path.write_bytes(make_pdf(PAGE_COUNT))
+    small = tmp_path / "small.pdf"
+    small.write_bytes(make_pdf(2, lines_per_page=2))
+
+    with PdfExtractor(workers=1, timeout=0.01) as extractor:
+        assert extractor.extract(str(path)) is None
+        extractor.timeout = 30
+        assert "Page 1 line 1" in extractor.extract(str(small))
+
+
+def test_extraction_recovers_from_a_killed_pool(tmp_path):
+    small = tmp_path / "small.pdf"
+    small.write_bytes(make_pdf(2, lines_per_page=2))
+
+    with PdfExtractor(workers=1) as extractor:
+        assert extractor.extract(str(small))
+        # What another thread's timeout does to the pool this extraction is using
+        for process in list(extractor._pool._processes.values()):
+            process.terminate()
+            process.join()
+        assert "Page 1 line 1" in extractor.extract(str(small))
+
+
+def test_benchmark_process_pool_extraction(tmp_path):
+    data = make_pdf(PAGE_COUNT)
+    path = tmp_path / "textbook.pdf"
+    path.write_bytes(data)
+
+    with PdfExtractor(workers=1) as extractor:
+        extractor.extract(str(tmp_path / "missing.pdf"))  # start the worker outside the timing
+
+        started = time.perf_counter()
+        legacy = legacy_extract_pdf_text(data)
+        legacy_time = time.perf_counter() - started
+
+        started = time.perf_counter()
+        streamed = extractor.extract(str(path))
+        streamed_time = time.perf_counter() - started
+
+        # tracemalloc slows in-process parsing a lot, so measure memory on its own pass
+        tracemalloc.start()
+        legacy_extract_pdf_text(data)
+        legacy_peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        tracemalloc.start()
+        extractor.extract(str(path))
+        streamed_peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+    print(f"\n{PAGE_COUNT} pages: legacy {legacy_time:.2f}s / {legacy_peak / 1e6:.1f} MB, "
+          f"process pool {streamed_time:.2f}s / {streamed_peak / 1e6:.1f} MB in the crawler process")
+    assert streamed == legacy
+    assert streamed_time < legacy_time
+    assert streamed_peak < legacy_peak / 2
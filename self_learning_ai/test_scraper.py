@@ -0,0 +1,327 @@
+import hashlib
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from fetch_cache import FetchCache
+from frontier import MIN_INTERVAL, Frontier
+from pdf_extractor import PdfExtractor
+from scraper import fetch_open_edu_articles
+from test_pdf_extractor import make_pdf
+
+RESPONSE_DELAY = 0.1
+ARTICLE_BODY = "<html><body><h1>{title}</h1><p>" + "Open educational resources help students learn. " * 30 + "</p></body></html>"
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    # Serves the `routes` of its server after a fixed delay, with keep-alive and ETags
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        self.server.connections.add(self.client_address)
+        self.server.hits += 1
+        time.sleep(RESPONSE_DELAY)
+        body = self.server.routes.get(self.path)
+        if body is None:
+            self.send_response(404)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        data = body if isinstance(body, bytes) else body.encode("utf-8")
+        etag = '"' + hashlib.sha1(data).hexdigest()[:16] + '"'
+        if self.headers.get("If-None-Match") == etag:
+            self.server.not_modified += 1
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", "application/pdf" if self.path.endswith(".pdf") else "text/html; charset=utf-8")
+        self.send_header("ETag", etag)
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, *args):
+        pass
+
+
+def start_stand_in(routes):
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StandInHandler)
+    server.daemon_threads = True
+    server.routes = routes
+    server.connections = set()
+    server.hits = 0
+    server.not_modified = 0
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def start_hosts(count=4, docs_per_seed=3):
+    servers = []
+    for n in range(count):
+        routes = {f"/doc_{i}.html": ARTICLE_BODY.format(title=f"Host {n} document {i}") for i in range(docs_per_seed)}
+        links = "".join(f'<a href="/doc_{i}.html">doc {i}</a>' for i in range(docs_per_seed))
+        routes["/"] = f"<html><body>{links}<a href='/about'>about</a></body></html>"
+        servers.append(start_stand_in(routes))
+    return servers
+
+
+def seed_urls(servers):
+    return [f"http://127.0.0.1:{s.server_address[1]}/" for s in servers]
+
+
+def stop_all(servers):
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+
+def test_concurrent_crawl_is_faster_and_saves_same_articles(tmp_path):
+    servers = start_hosts()
+    try:
+        urls = seed_urls(servers)
+
+        started = time.perf_counter()
+        sequential = fetch_open_edu_articles(urls, limit=16, workers=1, per_host=1, delay=0,
+                                             out_dir=str(tmp_path / "sequential"))
+        sequential_time = time.perf_counter() - started
+
+        started = time.perf_counter()
+        concurrent = fetch_open_edu_articles(urls, limit=16, workers=8, per_host=2, delay=0,
+                                             out_dir=str(tmp_path / "concurrent"))
+        concurrent_time = time.perf_counter() - started
+    finally:
+        stop_all(servers)
+
+    assert sorted(os.path.basename(p) for p in concurrent) == sorted(os.path.basename(p) for p in sequential)
+    assert len(concurrent) == 12
+    assert concurrent_time < sequential_time / 2
+
+
+def test_crawl_reuses_connections_per_host(tmp_path):
+    servers = start_hosts(count=1)
+    try:
+        fetch_open_edu_articles(seed_urls(servers), limit=4, workers=4, per_host=1, delay=0,
+                                out_dir=str(tmp_path))
+    finally:
+        stop_all(servers)
+
+    # robots.txt, the seed page and three documents
+    assert servers[0].hits == 5
+    assert len(servers[0].connections) == 1
+
+
+def test_limit_stops_crawl(tmp_path):
+    servers = start_hosts(count=2)
+    try:
+        saved = fetch_open_edu_articles(seed_urls(servers), limit=4, workers=2, per_host=2, delay=0,
+                                        out_dir=str(tmp_path))
+    finally:
+        stop_all(servers)
+
+    assert len(saved) == 2
+    assert all(os.path.exists(p) for p in saved)
+
+
+def test_cache_revalidates_and_skips_unchanged_articles(tmp_path):
+    servers = start_hosts(count=1)
+    cache = FetchCache(str(tmp_path / "crawl.db"))
+    try:
+        urls = seed_urls(servers)
+        first = fetch_open_edu_articles(urls, limit=4, delay=0, out_dir=str(tmp_path), cache=cache)
+        second = fetch_open_edu_articles(urls, limit=4, delay=0, out_dir=str(tmp_path), cache=cache)
+
+        servers[0].routes["/doc_1.html"] = servers[0].routes["/doc_1.html"].replace("students", "teachers")
+        third = fetch_open_edu_articles(urls, limit=4, delay=0, out_dir=str(tmp_path), cache=cache)
+    finally:
+        cache.close()
+        stop_all(servers)
+
+    assert len(first) == 3
+    assert second == []
+    assert servers[0].not_modified == 4 + 3
+    assert third == [first[1]]
+
+
+def test_cache_drops_duplicate_content(tmp_path):
+    servers = start_hosts(count=2)
+    for server in servers:
+        for route in ("/doc_0.html", "/doc_1.html", "/doc_2.html"):
+            server.routes[route] = ARTICLE_BODY.format(title="Mirrored document")
+    cache = FetchCache(":memory:")
+    try:
+        saved = fetch_open_edu_articles(seed_urls(servers), limit=8, delay=0, out_dir=str(tmp_path), cache=cache)
+    finally:
+        cache.close()
+        stop_all(servers)
+
+    # Every mirrored document has the same text, so only the first one is kept
+    assert len(saved) == 1
+
+
+def test_robots_txt_is_respected(tmp_path):
+    servers = start_hosts(count=1)
+    servers[0].routes["/robots.txt"] = "User-agent: *\nDisallow: /doc_1.html\n"
+    try:
+        saved = fetch_open_edu_articles(seed_urls(servers), limit=4, delay=0, out_dir=str(tmp_path))
+    finally:
+        stop_all(servers)
+
+    assert len(saved) == 2
+
+
+def test_cache_and_frontier_share_one_database(tmp_path):
+    servers = start_hosts(count=1)
+    db = str(tmp_path / "crawl.db")
+    try:
+        started = time.perf_counter()
+        with FetchCache(db) as cache, Frontier(db, max_depth=1) as frontier:
+            first = fetch_open_edu_articles(seed_urls(servers), limit=4, delay=0, out_dir=str(tmp_path),
+                                            cache=cache, frontier=frontier)
+        elapsed = time.perf_counter() - started
+        with FetchCache(db) as cache, Frontier(db, max_depth=1) as frontier:
+            assert cache.get(seed_urls(servers)[0] + "doc_0.html")["path"] in first
+            assert frontier.pending() == 0
+    finally:
+        stop_all(servers)
+
+    # Cache writes inside the frontier's open batch transaction must not wait on a lock
+    assert len(first) == 3
+    assert elapsed < 4
+
+
+def test_malformed_links_do_not_end_the_crawl(tmp_path):
+    servers = start_hosts(count=1, docs_per_seed=2)
+    servers[0].routes["/"] = ("<a href='http://127.0.0.1:80x/bad.html'>bad port</a>"
+                              "<a href='http://127.0.0.1:99999/big.html'>port out of range</a>" + servers[0].routes["/"])
+    db = str(tmp_path / "crawl.db")
+    try:
+        with Frontier(db, max_depth=1, robots=False) as frontier:
+            saved = fetch_open_edu_articles(seed_urls(servers), limit=8, delay=0, out_dir=str(tmp_path),
+                                            frontier=frontier)
+            assert frontier.pending() == 0
+    finally:
+        stop_all(servers)
+
+    assert len(saved) == 2
+
+
+def test_links_to_other_sites_are_not_followed(tmp_path):
+    servers = start_hosts(count=2, docs_per_seed=1)
+    # Same stand-in, but reached as "localhost" it is another site than the 127.0.0.1 seed
+    offsite = f"http://localhost:{servers[1].server_address[1]}"
+    servers[0].routes["/"] += f"<a href='{offsite}/doc_0.html'>mirror</a><a href='{offsite}/'>partner</a>"
+    try:
+        saved = fetch_open_edu_articles(seed_urls(servers[:1]), limit=8, delay=0, out_dir=str(tmp_path / "seeds"))
+        assert servers[1].hits == 0
+        allowed = fetch_open_edu_articles(seed_urls(servers[:1]), limit=8, delay=0, out_dir=str(tmp_path / "allowed"),
+                                          allowed_hosts=["localhost"])
+    finally:
+        stop_all(servers)
+
+    assert len(saved) == 1
+    assert len(allowed) == 2
+
+
+def test_persistent_frontier_crawls_deeper_across_cycles(tmp_path):
+    servers = start_hosts(count=1, docs_per_seed=1)
+    routes = servers[0].routes
+    routes["/"] = "<html><body><a href='/section/'>section</a><a href='/doc_0.html'>doc</a></body></html>"
+    routes["/section/"] = "<html><body><a href='/section/deep.html'>deep</a></body></html>"
+    routes["/section/deep.html"] = ARTICLE_BODY.format(title="Deep document")
+    db = str(tmp_path / "crawl.db")
+    saved = []
+    try:
+        # One URL per cycle, reopening the frontier each time as a restarted pipeline would
+        for _ in range(4):
+            with Frontier(db, max_depth=2) as frontier:
+                saved += fetch_open_edu_articles(seed_urls(servers), limit=1, delay=0,
+                                                 out_dir=str(tmp_path), frontier=frontier)
+        with Frontier(db, max_depth=2) as frontier:
+            assert frontier.pending() == 0
+    finally:
+        stop_all(servers)
+
+    assert len(saved) == 2
+    assert servers[0].hits == 4 + 1
+
+
+def test_pdfs_are_streamed_and_capped(tmp_path):
+    servers = start_hosts(count=1, docs_per_seed=0)
+    small, large = make_pdf(3), make_pdf(40)
+    servers[0].routes["/"] = "<html><body><a href='/notes.pdf'>notes</a><a href='/book.pdf'>book</a></body></html>"
+    servers[0].routes["/notes.pdf"] = small
+    servers[0].routes["/book.pdf"] = large
+    try:
+        saved = fetch_open_edu_articles(seed_urls(servers), limit=3, delay=0, out_dir=str(tmp_path),
+                                        max_pdf_bytes=len(small))
+    finally:
+        stop_all(servers)
+
+    assert len(saved) == 1
+    assert os.path.basename(saved[0]).startswith("notes_")
+    with open(saved[0], encoding="utf-8") as f:
+        assert "Page 2 line 0" in f.read()
+
+
+class FlakyExtractor(PdfExtractor):
+    # Fails its first extraction, as a timed-out or crashed worker would
+    failures = 1
+
+    def extract(self, path):
+        if self.failures:
+            self.failures -= 1
+            return None
+        return super().extract(path)
+
+
+def test_failed_pdf_extraction_is_retried_not_cached(tmp_path):
+    servers = start_hosts(count=1, docs_per_seed=0)
+    servers[0].routes["/"] = "<html><body><a href='/notes.pdf'>notes</a></body></html>"
+    servers[0].routes["/notes.pdf"] = make_pdf(3)
+    db = str(tmp_path / "crawl.db")
+    urls = seed_urls(servers)
+    pdf_url = urls[0] + "notes.pdf"
+    try:
+        with FlakyExtractor(workers=1) as extractor, FetchCache(db) as cache, \
+                Frontier(db, max_depth=1, robots=False) as frontier:
+            first = fetch_open_edu_articles(urls, limit=2, delay=0, out_dir=str(tmp_path), cache=cache,
+                                            frontier=frontier, extractor=extractor)
+            assert cache.get(pdf_url) is None
+            # Due again after the short failure backoff, not a week later
+            with frontier._lock:
+                (next_fetch,) = frontier._db.execute("SELECT next_fetch FROM frontier WHERE url = ?",
+                                                     (pdf_url,)).fetchone()
+            assert next_fetch - time.time() == pytest.approx(MIN_INTERVAL, abs=60)
+
+            # Once the backoff has passed, the next crawl extracts and saves it
+            with frontier._lock:
+                frontier._db.execute("UPDATE frontier SET next_fetch = 0 WHERE url = ?", (pdf_url,))
+            second = fetch_open_edu_articles(urls, limit=2, delay=0, out_dir=str(tmp_path), cache=cache,
+                                             frontier=frontier, extractor=extractor)
+            assert cache.get(pdf_url)["path"] == second[0]
+    finally:
+        stop_all(servers)
+
+    assert first == []
+    assert len(second) == 1
+
+
+def test_beautifulsoup_fallback_saves_same_text(tmp_path):
+    servers = start_hosts(count=1)
+    try:
+        urls = seed_urls(servers)
+        streamed = fetch_open_edu_articles(urls, limit=4, delay=0, out_dir=str(tmp_path / "stream"))
+        souped = fetch_open_edu_articles(urls, limit=4, delay=0, out_dir=str(tmp_path / "bs4"), html_parser="bs4")
+    finally:
+        stop_all(servers)
+
+    assert len(streamed) == 3
+    for a, b in zip(sorted(streamed), sorted(souped)):
+        with open(a, encoding="utf-8") as fa, open(b, encoding="utf-8") as fb:
+            assert fa.read() == fb.read()
@@ -0,0 +1,202 @@
+import os
+import pickle
+import signal
+from concurrent.futures import ThreadPoolExecutor
+
+import document
+from dataset import DatasetReader, DatasetWriter
+from document import Document
+from fetch_cache import FetchCache
+from frontier import Frontier
+from pdf_extractor import PdfExtractor
+import stages
+from cleaner import clean_text
+from stages import MAX_SLEEP, MIN_SLEEP, StagedPipeline, clean_batch, plan_next_cycle, process_batch
+from summarizer import summarize_batch
+from test_scraper import seed_urls, start_stand_in, stop_all
+from test_summarizer import TOPICS, make_article
+
+
+def start_corpus(docs=6):
+    routes = {f"/unit_{i}.html": f"<html><body><p>{make_article(TOPICS[i % len(TOPICS)], 30, seed=i)}</p></body></html>"
+              for i in range(docs)}
+    routes["/"] = "<html><body>" + "".join(f"<a href='/unit_{i}.html'>unit</a>" for i in range(docs)) + "</body></html>"
+    return start_stand_in(routes)
+
+
+def make_runner(tmp_path, server, **kwargs):
+    runner = StagedPipeline(seed_urls([server]), FetchCache(":memory:"), Frontier(":memory:", max_depth=1),
+                            PdfExtractor(workers=1), DatasetWriter(str(tmp_path / "fine_tune")),
+                            summary_dir=str(tmp_path / "summaries"),
+                            crawl_options={"delay": 0, "out_dir": str(tmp_path / "raw")}, **kwargs)
+    return runner
+
+
+def close_runner(runner):
+    runner.close()
+    runner.extractor.close()
+    runner.writer.close()
+    runner.frontier.close()
+    runner.cache.close()
+
+
+def test_batches_clean_then_summarize_and_score(monkeypatch):
+    docs, snapshot = clean_batch([("a.txt", make_article("graphs")), ("b.txt", make_article("hashing"))])
+    assert [doc.source for doc in docs] == ["a.txt", "b.txt"]
+    assert "graphs" in docs[0].term_counts and "graphs" not in docs[1].term_counts
+    assert snapshot is None
+
+    # Documents come back from the worker already split; summarizing and scoring reuse that
+    docs = pickle.loads(pickle.dumps(docs))
+    calls = []
+    original = document.tokenize
+    monkeypatch.setattr(document, "tokenize", lambda sentence: calls.append(sentence) or original(sentence))
+    results, snapshot = process_batch(docs)
+    # Only the summaries themselves are tokenized, for scoring
+    assert len(calls) == sum(len(Document(r[2]).sentences) for r in results)
+    assert [r[0] for r in results] == ["a.txt", "b.txt"]
+    assert all(r[2] and r[3] > 0 for r in results)
+    assert snapshot is None
+
+
+def test_plan_next_cycle_follows_frontier():
+    with Frontier(":memory:", robots=False) as frontier:
+        assert plan_next_cycle(frontier) == MAX_SLEEP
+        frontier.add("https://a.example/", 0)
+        assert plan_next_cycle(frontier) == MIN_SLEEP
+        url, _ = frontier.next_batch(1)[0]
+        frontier.complete(url, changed=False)
+        assert plan_next_cycle(frontier, backlog=3) == MIN_SLEEP
+        assert MIN_SLEEP < plan_next_cycle(frontier) <= MAX_SLEEP
+
+
+def test_cycle_passes_articles_through_all_stages(tmp_path):
+    server = start_corpus()
+    runner = make_runner(tmp_path, server, batch_size=4, workers=1)
+    try:
+        stats = runner.run_cycle()
+        again = runner.run_cycle()
+    finally:
+        close_runner(runner)
+        stop_all([server])
+
+    assert stats["articles"] == 6
+    assert stats["saved"] == 6
+    assert again["articles"] == 0
+    assert len(os.listdir(tmp_path / "summaries")) == 6
+    with DatasetReader(str(tmp_path / "fine_tune")) as reader:
+        assert len(reader) == 6
+
+
+def test_summaries_use_idf_over_the_whole_cycle(tmp_path):
+    # Every unit shares a long "algorithms" part, which only IDF over the cycle recognises as common
+    routes = {f"/unit_{i}.html": f"<html><body><p>{make_article(TOPICS[i], 10, seed=i)} "
+                                 f"{make_article('algorithms', 35, seed=i + 50)}</p></body></html>"
+              for i in range(6)}
+    routes["/"] = "<html><body>" + "".join(f"<a href='/unit_{i}.html'>unit</a>" for i in range(6)) + "</body></html>"
+    server = start_stand_in(routes)
+    runner = make_runner(tmp_path, server, batch_size=1, workers=1)
+    try:
+        runner.run_cycle()
+    finally:
+        close_runner(runner)
+        stop_all([server])
+
+    # One-article micro-batches must summarize exactly as one batch over the cycle would
+    raw = sorted(os.listdir(tmp_path / "raw"))
+    texts = [clean_text((tmp_path / "raw" / name).read_text(encoding="utf-8")) for name in raw]
+    expected = {f"summary_{os.path.splitext(name)[0]}.txt": summary
+                for name, summary in zip(raw, summarize_batch(texts))}
+    written = {name: (tmp_path / "summaries" / name).read_text(encoding="utf-8")
+               for name in os.listdir(tmp_path / "summaries")}
+    assert written == expected
+    assert all(summary != summarize_batch([text])[0] for text, summary in zip(texts, summarize_batch(texts)))
+
+
+def test_articles_lost_in_processing_are_fetched_again(tmp_path, monkeypatch):
+    server = start_corpus(docs=3)
+    runner = make_runner(tmp_path, server, workers=1)
+    url = seed_urls([server])[0] + "unit_0.html"
+
+    def broken(articles, idf=None, collect_metrics=False):
+        raise RuntimeError("worker died")
+
+    try:
+        with monkeypatch.context() as patch:
+            patch.setattr(stages, "process_batch", broken)
+            runner._pool = ThreadPoolExecutor(max_workers=1)
+            lost = runner.run_cycle()
+            runner.close()
+        assert runner.cache.get(url) is None
+        assert runner.frontier.pending() == 3
+        retried = runner.run_cycle()
+    finally:
+        close_runner(runner)
+        stop_all([server])
+
+    assert lost["failed"] == 3
+    assert retried["saved"] == 3
+    with DatasetReader(str(tmp_path / "fine_tune")) as reader:
+        assert len(reader) == 3
+
+
+def dying_clean_batch(articles, collect_metrics=False):
+    # Stands in for a worker the OOM killer takes out while cleaning the "recursion" unit
+    if any("recursion" in text for _, text in articles):
+        os.kill(os.getpid(), signal.SIGKILL)
+    return clean_batch(articles, collect_metrics)
+
+
+def test_cycle_survives_a_killed_worker(tmp_path, monkeypatch):
+    server = start_corpus()
+    runner = make_runner(tmp_path, server, batch_size=1, workers=1)
+    url = seed_urls([server])[0] + "unit_0.html"
+    try:
+        with monkeypatch.context() as patch:
+            patch.setattr(stages, "clean_batch", dying_clean_batch)
+            killed = runner.run_cycle()
+        assert runner.cache.get(url) is None
+        retried = runner.run_cycle()
+    finally:
+        close_runner(runner)
+        stop_all([server])
+
+    assert killed["articles"] == 6
+    assert killed["failed"] >= 1
+    assert killed["saved"] + killed["failed"] == 6
+    assert retried["saved"] == killed["failed"]
+    with DatasetReader(str(tmp_path / "fine_tune")) as reader:
+        assert len(reader) == 6
+
+
+def test_sigterm_stops_crawl_and_drains_in_flight_articles(tmp_path, monkeypatch):
+    server = start_corpus(docs=12)
+    runner = make_runner(tmp_path, server, workers=1)
+    runner.crawl_options["workers"] = 2
+    crawl = stages.fetch_open_edu_articles
+
+    def signalled_crawl(*args, on_article, **kwargs):
+        # SIGTERM arrives as the first article is handed over; its batch-mate is still in flight
+        def forward(*article):
+            on_article(*article)
+            if not runner.stop.is_set():
+                os.kill(os.getpid(), signal.SIGTERM)
+                assert runner.stop.wait(5)
+        return crawl(*args, on_article=forward, **kwargs)
+
+    monkeypatch.setattr(stages, "fetch_open_edu_articles", signalled_crawl)
+    previous = signal.getsignal(signal.SIGTERM), signal.getsignal(signal.SIGINT)
+    runner.install_signal_handlers()
+    try:
+        stats = runner.run_cycle()
+    finally:
+        signal.signal(signal.SIGTERM, previous[0])
+        signal.signal(signal.SIGINT, previous[1])
+        close_runner(runner)
+        stop_all([server])
+
+    assert runner.stop.is_set()
+    assert stats["articles"] == 2
+    assert stats["saved"] + stats["skipped"] == stats["articles"]
+    with DatasetReader(str(tmp_path / "fine_tune")) as reader:
+        assert len(reader) == stats["saved"]
@@ -0,0 +1,66 @@
+import random
+import time
+
+import document
+from document import Document
+from summarizer import summarize_batch, summarize_text
+
+TOPICS = ["recursion", "sorting", "graphs", "hashing", "databases", "networks", "compilers", "security"]
+FILLER = ["students", "practice", "examples", "lecture", "notes", "problems", "review", "chapter"]
+
+
+def make_article(topic, sentences=60, seed=0):
+    rng = random.Random(seed)
+    lines = [f"This chapter introduces {topic} and explains why {topic} matters in computer science."]
+    for i in range(sentences - 2):
+        words = rng.sample(FILLER, 4)
+        lines.append(f"Section {i} covers {words[0]} {words[1]} with {words[2]} and {words[3]} about {topic}.")
+    lines.append(f"In conclusion, {topic} gives students a foundation for later courses.")
+    return " ".join(lines)
+
+
+def test_short_text_keeps_sentence_order():
+    summary = summarize_text("First sentence here. Second sentence here. Third sentence here. Fourth sentence here.")
+    assert summary.split(". ")[0] == "First sentence here"
+    assert summary.count(".") == 3
+
+
+def test_professor_level_is_longer():
+    article = make_article("recursion")
+    assert len(summarize_text(article, "professor")) > len(summarize_text(article, "student"))
+
+
+def test_batch_idf_downweights_corpus_boilerplate():
+    boilerplate = "Sign in to the course website navigation menu to track course website progress."
+    docs = [boilerplate + " " + make_article(topic, 20, seed=i) for i, topic in enumerate(TOPICS)]
+    for summary in summarize_batch(docs):
+        assert "navigation menu" not in summary
+
+
+def test_redundant_sentences_are_skipped():
+    sentence = "Graph search explores vertices and edges to find shortest paths between nodes."
+    text = " ".join([sentence] * 5 + [make_article("graphs", 10)])
+    assert summarize_text(text).count(sentence) == 1
+
+
+def test_batch_tokenizes_each_sentence_once(monkeypatch):
+    calls = []
+    original = document.tokenize
+    monkeypatch.setattr(document, "tokenize", lambda sentence: calls.append(sentence) or original(sentence))
+
+    docs = [Document(make_article(topic, 30)) for topic in TOPICS]
+    summarize_batch(docs)
+    summarize_batch(docs, "professor")
+    assert len(calls) == 30 * len(TOPICS)
+
+
+def test_benchmark_batch_summarization():
+    docs = [make_article(TOPICS[i % len(TOPICS)], 80, seed=i) for i in range(300)]
+
+    started = time.perf_counter()
+    summaries = summarize_batch(docs, "professor")
+    elapsed = time.perf_counter() - started
+
+    print(f"\n{len(docs)} articles summarized in {elapsed:.2f}s ({len(docs) / elapsed:.0f} docs/s)")
+    assert all(summaries)
+    assert elapsed < 10
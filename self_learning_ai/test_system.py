@@ -1,5 +1,6 @@
 import os
 import sys
+import tempfile
 
 def test_imports():
     print("Testing imports...")
@@ -32,10 +33,11 @@ def test_directory_structure():
         else:
             print(f"✅ Directory exists: {dir_path}")
 
-def test_basic_functionality():
+def test_basic_functionality(tmp_path):
     print("\nTesting basic functionality...")
     
     from cleaner import clean_text
+    from dataset import DatasetWriter
     from summarizer import summarize_text
     from evaluator import evaluate_summary
     from trainer import save_training_pair
@@ -54,9 +56,10 @@ def test_basic_functionality():
     score = evaluate_summary(summary)
     print(f"Evaluation score: {score}")
     
-    # Test saving
+    # Test saving, into a scratch dataset rather than data/fine_tune
     try:
-        save_training_pair("test input", "test output", "test_pair.json")
+        with DatasetWriter(os.path.join(str(tmp_path), "fine_tune")) as writer:
+            save_training_pair("test input", "test output", "test_pair.json", writer=writer)
         print("✅ Training pair saved successfully")
     except Exception as e:
         print(f"❌ Error saving training pair: {str(e)}")
@@ -65,5 +68,6 @@ if __name__ == "__main__":
     print("🧪 Starting system tests...")
     if test_imports():
         test_directory_structure()
-        test_basic_functionality()
+        with tempfile.TemporaryDirectory() as tmp:
+            test_basic_functionality(tmp)
     print("\n✨ Tests completed")
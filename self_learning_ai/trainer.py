@@ -1,11 +1,26 @@
-import json
+import atexit
 import os
 
-def save_training_pair(article_text, summary, filename):
+import metrics
+from dataset import DatasetWriter
+
+_writer = None
+
+
+def _default_writer():
+    global _writer
+    if _writer is None:
+        _writer = DatasetWriter()
+        atexit.register(_writer.close)
+    return _writer
+
+
+@metrics.instrumented("save")
+def save_training_pair(article_text, summary, filename=None, writer=None):
+    # Appends the pair to the sharded dataset; returns False when an identical pair is stored already
     pair = {
+        "id": os.path.splitext(filename)[0] if filename else None,
         "input": article_text.strip(),
         "output": summary.strip()
     }
-    os.makedirs("data/fine_tune", exist_ok=True)
-    with open(os.path.join("data", "fine_tune", filename), "w", encoding="utf-8") as f:
-        json.dump(pair, f, indent=4)
+    return (writer or _default_writer()).append(pair)
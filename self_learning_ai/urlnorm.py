@@ -0,0 +1,34 @@
+import posixpath
+from urllib.parse import parse_qsl, quote, unquote, urlencode, urlsplit, urlunsplit
+
+DEFAULT_PORTS = {"http": 80, "https": 443}
+TRACKING_PARAMS = ("utm_", "fbclid", "gclid", "mc_cid", "mc_eid")
+
+
+def _clean_path(path):
+    # Resolve dot segments and re-quote so /a/./b and /a/%62 normalize alike
+    if not path:
+        return "/"
+    resolved = posixpath.normpath(unquote(path))
+    if resolved == ".":
+        resolved = "/"
+    if path.endswith("/") and not resolved.endswith("/"):
+        resolved += "/"
+    return quote(resolved, safe="/:@!$&'()*+,;=-._~")
+
+
+def normalize_url(url):
+    # Raises ValueError for URLs that cannot be parsed: no host, a bad port, unbalanced brackets
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or "").lower()
+    if not host:
+        raise ValueError(f"URL has no host: {url!r}")
+    port = parts.port
+    netloc = host if port is None or DEFAULT_PORTS.get(scheme) == port else f"{host}:{port}"
+
+    query = [(k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True)
+             if not k.lower().startswith(TRACKING_PARAMS)]
+    query.sort()
+
+    return urlunsplit((scheme, netloc, _clean_path(parts.path), urlencode(query), ""))